@@ -0,0 +1,115 @@
+import hashlib
+import hmac
+import time
+
+from werkzeug.exceptions import BadRequest, Forbidden, NotFound
+
+from odoo import http
+from odoo.exceptions import ValidationError
+from odoo.http import request
+
+from ..models.json_tools import decode_json
+from ..models.sync_metrics import COUNTERS, PHASES
+
+# Parameter holding the token the scraper must send, the route is disabled while it is not set
+METRICS_TOKEN_PARAM = "connector_dummy_erp.metrics_token"
+
+# Maximum age in seconds of a signed webhook request, older requests are refused so captured ones cannot be replayed
+WEBHOOK_TOLERANCE_SECONDS = 300
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class DummyERPMetricsController(http.Controller):
+
+    @http.route("/dummy_erp/metrics", type="http", auth="public", methods=["GET"], csrf=False, sitemap=False)
+    def metrics(self, token=None, **kwargs):
+        """
+        Expose the metrics of the last run of each sync job in the Prometheus text format. The token is sent as a
+        bearer token or as the token query parameter.
+        :param token: metrics token, when it is not sent in the Authorization header
+        :return: Prometheus text response
+        """
+        expected_token = request.env["ir.config_parameter"].sudo().get_param(METRICS_TOKEN_PARAM)
+        if not expected_token:
+            raise NotFound()
+        authorization = request.httprequest.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer "):]
+        if not token or not hmac.compare_digest(token, expected_token):
+            raise Forbidden()
+
+        runs = request.env["dummy.erp.sync.run"].sudo()._get_last_runs()
+        metrics = [
+            ("dummy_erp_sync_last_run_timestamp_seconds", "Start of the last run of the job", "started_at", {}),
+            ("dummy_erp_sync_last_duration_seconds", "Duration of the last run of the job", "duration", {}),
+        ]
+        metrics += [
+            ("dummy_erp_sync_last_phase_seconds", "Time spent per phase by the last run of the job", f"{phase}_time",
+             {"phase": phase})
+            for phase in PHASES
+        ]
+        metrics += [
+            (f"dummy_erp_sync_last_{name}", f"Number of {name} of the last run of the job", f"{name}_count", {})
+            for name in COUNTERS
+        ]
+        lines = []
+        described = set()
+        for name, description, column, extra_labels in metrics:
+            if name not in described:
+                described.add(name)
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+            for run in runs:
+                labels = {
+                    "integration_id": run["integration_id"],
+                    "integration": run["integration_name"],
+                    "job": run["job"],
+                    **extra_labels,
+                }
+                label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {float(run[column] or 0)}")
+        return request.make_response(
+            "\n".join(lines) + "\n", headers=[("Content-Type", "text/plain; version=0.0.4; charset=utf-8")]
+        )
+
+
+class DummyERPWebhookController(http.Controller):
+
+    @http.route("/dummy_erp/webhook/<int:integration_id>", type="http", auth="public", methods=["POST"], csrf=False,
+                sitemap=False)
+    def webhook(self, integration_id, **kwargs):
+        """
+        Queue the change notifications pushed by the remote ERP. The timestamp header and the body are signed with the
+        webhook secret of the integration, requests older than WEBHOOK_TOLERANCE_SECONDS are refused. The body holds
+        one event or a list of events under the events key, each event has the resource (product, user or cart), the
+        remote id and optionally the remote record as data.
+        :param integration_id: dummy.erp.integration id
+        :return: JSON response with the number of queued events
+        """
+        integration = request.env["dummy.erp.integration"].sudo().browse(integration_id).exists()
+        if not (integration and integration.active and integration.webhook_enabled and integration.webhook_secret):
+            raise NotFound()
+        headers = request.httprequest.headers
+        timestamp = headers.get("X-Dummy-ERP-Timestamp", "")
+        if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > WEBHOOK_TOLERANCE_SECONDS:
+            raise Forbidden()
+        body = request.httprequest.get_data()
+        expected_signature = "sha256=" + hmac.new(
+            integration.webhook_secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256
+        ).hexdigest()
+        if not hmac.compare_digest(headers.get("X-Dummy-ERP-Signature", ""), expected_signature):
+            raise Forbidden()
+        try:
+            data = decode_json(body)
+        except ValueError:
+            raise BadRequest("Invalid JSON body")
+        events = data.get("events") if isinstance(data, dict) and "events" in data else [data]
+        if not isinstance(events, list) or not all(isinstance(event, dict) for event in events):
+            raise BadRequest("Invalid events")
+        try:
+            queued = request.env["dummy.erp.webhook.event"].sudo()._queue_events(integration, events)
+        except ValidationError as exc:
+            raise BadRequest(str(exc))
+        return request.make_json_response({"queued": queued}, status=202)
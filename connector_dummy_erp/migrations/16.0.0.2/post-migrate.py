@@ -0,0 +1,26 @@
+def migrate(cr, version):
+    """
+    Create the bindings of the records synced before the binding model existed from their dummy_erp_id fields.
+    Exported records were not linked to an integration, they are bound to the first integration.
+    """
+    for table, res_model in (
+            ("product_template", "product.template"),
+            ("res_users", "res.users"),
+            ("sale_order", "sale.order"),
+    ):
+        cr.execute(f"""
+            INSERT INTO dummy_erp_binding (integration_id, res_model, res_id, dummy_erp_id, create_uid, create_date,
+                                           write_uid, write_date)
+            SELECT coalesce(t.dummy_erp_integration_id, (SELECT min(id) FROM dummy_erp_integration)), %s, t.id,
+                   t.dummy_erp_id, 1, now() at time zone 'UTC', 1, now() at time zone 'UTC'
+            FROM {table} t
+            WHERE t.dummy_erp_id IS NOT NULL AND t.dummy_erp_id != 0
+              AND coalesce(t.dummy_erp_integration_id, (SELECT min(id) FROM dummy_erp_integration)) IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """, (res_model,))
+    cr.execute("""
+        UPDATE dummy_erp_binding b
+        SET company_id = i.company_id
+        FROM dummy_erp_integration i
+        WHERE i.id = b.integration_id AND b.company_id IS NULL
+    """)
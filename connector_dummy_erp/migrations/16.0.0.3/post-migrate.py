@@ -0,0 +1,17 @@
+def migrate(cr, version):
+    """
+    Queue the records marked to be updated before the outbox existed, so the exporters keep sending them.
+    """
+    for table, res_model in (
+            ("product_template", "product.template"),
+            ("sale_order", "sale.order"),
+    ):
+        cr.execute(f"""
+            INSERT INTO dummy_erp_outbox (integration_id, res_model, res_id, enqueued_at, create_uid, create_date,
+                                          write_uid, write_date)
+            SELECT t.dummy_erp_integration_id, %s, t.id, coalesce(t.write_date, now() at time zone 'UTC'),
+                   1, now() at time zone 'UTC', 1, now() at time zone 'UTC'
+            FROM {table} t
+            WHERE t.update_to_dummy_erp
+            ON CONFLICT DO NOTHING
+        """, (res_model,))
@@ -0,0 +1,17 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """
+    Every integration used to export all the queued changes: the unbound records are now exported by the first
+    integration and the existing outbox entries are routed, the outbox index now starts with the integration.
+    """
+    cr.execute("DROP INDEX IF EXISTS dummy_erp_outbox_res_model_enqueued_at_index")
+    cr.execute("SELECT id FROM dummy_erp_integration WHERE export_unbound_records LIMIT 1")
+    if not cr.fetchone():
+        cr.execute("""
+            UPDATE dummy_erp_integration SET export_unbound_records = true
+            WHERE id = (SELECT min(id) FROM dummy_erp_integration WHERE active)
+        """)
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env["dummy.erp.outbox"]._route_unbound()
@@ -0,0 +1,13 @@
+import secrets
+
+
+def migrate(cr, version):
+    """
+    The default webhook secret is computed once when the column is added, give each existing integration its own.
+    """
+    cr.execute("SELECT id FROM dummy_erp_integration")
+    for integration_id, in cr.fetchall():
+        cr.execute(
+            "UPDATE dummy_erp_integration SET webhook_secret = %s WHERE id = %s",
+            (secrets.token_urlsafe(32), integration_id),
+        )
@@ -1,5 +1,10 @@
+from . import dummy_erp_binding
 from . import dummy_erp_integration
 from . import dummy_erp_integration_log
+from . import dummy_erp_job
+from . import dummy_erp_outbox
+from . import dummy_erp_sync_run
+from . import dummy_erp_webhook_event
 from . import ir_cron
 from . import product_template
 from . import res_users
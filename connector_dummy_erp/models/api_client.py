@@ -1,4 +1,33 @@
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .sync_metrics import bind_metrics, count, span
+
+_logger = logging.getLogger(__name__)
+
+# Only idempotent methods are retried, a retried POST could create the same record twice in the remote ERP
+RETRY_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Pooled sessions of this worker process, keyed by (database, integration id)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Fields stored on imported records to detect unchanged images
+IMAGE_STATE_FIELDS = [
+    "dummy_erp_image_url",
+    "dummy_erp_image_etag",
+    "dummy_erp_image_last_modified",
+    "dummy_erp_image_checksum",
+]
 
 
 def get_headers():
@@ -8,6 +37,7 @@ def get_headers():
     """
     return {
         "Content-Type": "application/json",
+        "Accept-Encoding": "gzip, deflate",
     }
 
 
@@ -24,7 +54,84 @@ def get_request_url(integration, path):
     return integration._get_base_url() + path
 
 
-def perform_request(integration, method, payload, path, add_headers=None):
+def get_session(http_config):
+    """Return the keep-alive session of the integration for this worker, it is created on first use and rebuilt when
+    the pool or retry settings change. Sessions are shared by the threads of the worker, only the connection pool is
+    relied on so they can be used concurrently.
+
+    Args:
+        http_config (dict): HTTP settings of the integration as returned by _get_http_config
+
+    Returns:
+        object: requests.Session
+    """
+    settings = (http_config["pool_size"], http_config["max_retries"], http_config["backoff_factor"])
+    with _sessions_lock:
+        cached = _sessions.get(http_config["key"])
+        if cached and cached[0] == settings:
+            return cached[1]
+        retry = Retry(
+            total=http_config["max_retries"],
+            backoff_factor=http_config["backoff_factor"],
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=http_config["pool_size"], pool_maxsize=http_config["pool_size"], max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _sessions[http_config["key"]] = (settings, session)
+        return session
+
+
+def count_response(response, stream=False):
+    """Add a received response to the counters of the current sync run
+
+    Args:
+        response (object): requests.response
+        stream (bool): the body is not read yet, its size is taken from the Content-Length header
+    """
+    count("requests")
+    if stream:
+        count("bytes", int(response.headers.get("Content-Length") or 0))
+    else:
+        count("bytes", len(response.content))
+    retries = getattr(response.raw, "retries", None)
+    count("retries", len(retries.history) if retries else 0)
+    if response.status_code >= 400:
+        count("errors")
+
+
+def send_request(http_config, method, url, payload, headers, stream=False):
+    """Send HTTP request through the pooled session, it does not use the ORM so it can be called from any thread
+
+    Args:
+        http_config (dict): HTTP settings of the integration as returned by _get_http_config
+        method (str): HTTP method PUT, POST, ..
+        url (str): full URL for the http request
+        payload (dict): payload
+        headers (dict): HTTP headers
+        stream (bool): return before the body is received, the caller must consume or close the response
+
+    Returns:
+        object: requests.response
+    """
+    try:
+        response = get_session(http_config).request(
+            method, url, json=payload, headers=headers, timeout=http_config["timeout"], stream=stream
+        )
+    except requests.RequestException:
+        count("requests")
+        count("errors")
+        raise
+    count_response(response, stream=stream)
+    return response
+
+
+def perform_request(integration, method, payload, path, add_headers=None, stream=False):
     """Send HTTP request with given params
 
     Args:
@@ -33,6 +140,7 @@ def perform_request(integration, method, payload, path, add_headers=None):
         payload (dict): payload
         path (str): path to the endpoint
         add_headers (dict): additional HTTP headers
+        stream (bool): return before the body is received, the caller must consume or close the response
 
     Returns:
         object: requests.response
@@ -43,5 +151,197 @@ def perform_request(integration, method, payload, path, add_headers=None):
     # Merge headers
     headers = {**get_headers(), **add_headers}
 
-    response = requests.request(method, request_url, json=payload, headers=headers)
+    with span("http"):
+        response = send_request(integration._get_http_config(), method, request_url, payload, headers, stream=stream)
     return response
+
+
+def perform_requests(integration, requests_list):
+    """Send HTTP requests concurrently, the number of requests in flight is bounded by the integration concurrency
+
+    Args:
+        integration (object): dummy.erp.integration object
+        requests_list (list): list of (key, method, path, payload) tuples
+
+    Returns:
+        dict: mapping of each request key to its requests.response, or to the exception raised while sending it
+    """
+    if not requests_list:
+        return {}
+    # Everything needed from the ORM is read here, the threads only do HTTP
+    http_config = integration._get_http_config()
+    base_url = integration._get_base_url()
+    headers = get_headers()
+
+    def send(request):
+        key, method, path, payload = request
+        try:
+            return key, send_request(http_config, method, base_url + path, payload, headers)
+        except requests.RequestException as exc:
+            return key, exc
+
+    max_workers = max(1, min(integration.export_concurrency, len(requests_list)))
+    with span("http"), ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dummy_erp_export") as executor:
+        return dict(executor.map(bind_metrics(send), requests_list))
+
+
+def get_image_request(url, state):
+    """Compose the download request of an image, conditional headers are only sent when the URL did not change
+
+    Args:
+        url (str): URL of the image
+        state (dict): image state values (IMAGE_STATE_FIELDS) of the existing record, None for new records
+
+    Returns:
+        dict: image request with url, etag, last_modified and checksum keys
+    """
+    state = state or {}
+    same_url = state.get("dummy_erp_image_url") == url
+    return {
+        "url": url,
+        "etag": same_url and state.get("dummy_erp_image_etag"),
+        "last_modified": same_url and state.get("dummy_erp_image_last_modified"),
+        "checksum": state.get("dummy_erp_image_checksum"),
+    }
+
+
+def download_image(http_config, image_request):
+    """Download a single image with a conditional GET, failures are logged and degrade to no image
+
+    Args:
+        http_config (dict): HTTP settings of the integration as returned by _get_http_config
+        image_request (dict): image request as returned by get_image_request
+
+    Returns:
+        dict: {"changed": False} if the image did not change, otherwise the base64 encoded image with its etag,
+            last_modified and checksum. False if it cannot be downloaded
+    """
+    headers = {}
+    if image_request.get("etag"):
+        headers["If-None-Match"] = image_request["etag"]
+    if image_request.get("last_modified"):
+        headers["If-Modified-Since"] = image_request["last_modified"]
+    try:
+        response = get_session(http_config).get(image_request["url"], headers=headers, timeout=http_config["timeout"])
+        count_response(response)
+        if response.status_code == 304:
+            return {"changed": False}
+        response.raise_for_status()
+    except requests.RequestException as exc:
+        if not isinstance(exc, requests.HTTPError):
+            count("requests")
+            count("errors")
+        _logger.warning("Cannot download image %s: %s", image_request["url"], exc)
+        return False
+    # Servers without conditional GET support still send the same content, compare checksums to skip the write
+    checksum = hashlib.sha1(response.content).hexdigest()
+    result = {
+        "changed": checksum != image_request.get("checksum"),
+        "etag": response.headers.get("ETag", False),
+        "last_modified": response.headers.get("Last-Modified", False),
+        "checksum": checksum,
+    }
+    if result["changed"]:
+        result["image"] = base64.b64encode(response.content)
+    return result
+
+
+def fetch_images(integration, image_requests):
+    """Download the given images concurrently using a bounded pool of threads
+
+    Args:
+        integration (object): dummy.erp.integration object, defines the number of download workers
+        image_requests (dict): mapping of remote record id to its image request (see get_image_request)
+
+    Returns:
+        dict: mapping of remote record id to the download result (see download_image)
+    """
+    if not image_requests:
+        return {}
+    # The workers only do HTTP, the ORM is never used outside the calling thread
+    max_workers = max(1, min(integration.image_fetch_workers, len(image_requests)))
+    download = bind_metrics(partial(download_image, integration._get_http_config()))
+    with span("images"), ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dummy_erp_image") as executor:
+        return dict(zip(image_requests, executor.map(download, image_requests.values())))
+
+
+def get_image_vals(url, result, state):
+    """Compose the values to write on a record from its image download result, image_1920 is only written when the
+    content changed to avoid regenerating the resized images
+
+    Args:
+        url (str): URL of the image, False if the remote record has no image
+        result (dict): download result (see download_image)
+        state (dict): image state values of the existing record, None for new records
+
+    Returns:
+        dict: values to write on the record
+    """
+    if not url:
+        if state and not state.get("dummy_erp_image_url"):
+            return {}
+        return dict.fromkeys(["image_1920", "dummy_erp_image_pending"] + IMAGE_STATE_FIELDS, False)
+    if not result:
+        # Failed download: keep the current image of existing records
+        return {} if state else {"image_1920": False}
+    vals = {"dummy_erp_image_url": url, "dummy_erp_image_pending": False}
+    if result["changed"]:
+        vals.update({
+            "image_1920": result["image"],
+            "dummy_erp_image_etag": result["etag"],
+            "dummy_erp_image_last_modified": result["last_modified"],
+            "dummy_erp_image_checksum": result["checksum"],
+        })
+    elif "checksum" in result:
+        vals.update({
+            "dummy_erp_image_etag": result["etag"],
+            "dummy_erp_image_last_modified": result["last_modified"],
+        })
+    return vals
+
+
+def get_deferred_image_vals(url, state):
+    """Compose the values to write on a record whose image is downloaded later by the background job, only the URL is
+    stored and the record is marked as pending
+
+    Args:
+        url (str): URL of the image, False if the remote record has no image
+        state (dict): image state values of the existing record, None for new records
+
+    Returns:
+        dict: values to write on the record
+    """
+    if not url:
+        return get_image_vals(url, None, state)
+    vals = {"dummy_erp_image_url": url, "dummy_erp_image_pending": True}
+    if not state or state.get("dummy_erp_image_url") != url:
+        # The validators belong to the previous URL, the checksum is kept to detect an identical content
+        vals.update({"dummy_erp_image_etag": False, "dummy_erp_image_last_modified": False})
+    return vals
+
+
+def prepare_image_vals(integration, image_urls, image_states):
+    """Compose the image values of the records of an imported page. The changed images are downloaded concurrently,
+    or only their URL is stored when the integration downloads the images in the background
+
+    Args:
+        integration (object): dummy.erp.integration object
+        image_urls (dict): mapping of remote record id to its image URL, False if the record has no image
+        image_states (dict): mapping of remote record id to the image state values of the existing records
+
+    Returns:
+        dict: mapping of remote record id to the values to write on the record
+    """
+    if integration.defer_image_download:
+        return {
+            dummy_erp_id: get_deferred_image_vals(url, image_states.get(dummy_erp_id))
+            for dummy_erp_id, url in image_urls.items()
+        }
+    images = fetch_images(integration, {
+        dummy_erp_id: get_image_request(url, image_states.get(dummy_erp_id))
+        for dummy_erp_id, url in image_urls.items() if url
+    })
+    return {
+        dummy_erp_id: get_image_vals(url, images.get(dummy_erp_id), image_states.get(dummy_erp_id))
+        for dummy_erp_id, url in image_urls.items()
+    }
@@ -0,0 +1,51 @@
+import hashlib
+import hmac
+import json
+
+
+def _freeze(value):
+    """
+    Return a hashable version of the given value, lists and dicts (like x2many commands) are converted to tuples.
+    :param value: any value of a creation/write dictionary
+    :return: hashable value
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def group_writes(vals_by_id):
+    """Group the records that must be written with exactly the same values, so each group costs a single write
+
+    Args:
+        vals_by_id (dict): mapping of local record id to its write dictionary
+
+    Returns:
+        list: list of (vals, ids) tuples, one per distinct write dictionary
+    """
+    groups = {}
+    for record_id, vals in vals_by_id.items():
+        key = _freeze(vals)
+        if key not in groups:
+            groups[key] = (vals, [])
+        groups[key][1].append(record_id)
+    return list(groups.values())
+
+
+def payload_fingerprint(values, key=None):
+    """Compute a stable hash of the given payload, the keys order does not change the result
+
+    Args:
+        values (object): JSON serializable payload
+        key (str): secret key, the fingerprint is an HMAC when given. Required when the payload holds secrets
+            (e.g. passwords) so they cannot be brute-forced from the stored fingerprint
+
+    Returns:
+        str: hexadecimal fingerprint
+    """
+    message = json.dumps(values, sort_keys=True, separators=(",", ":"), default=str).encode()
+    if key:
+        return hmac.new(key.encode(), message, hashlib.sha256).hexdigest()
+    return hashlib.sha1(message).hexdigest()
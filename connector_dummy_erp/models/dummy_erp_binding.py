@@ -0,0 +1,96 @@
+from odoo import models, fields, api
+
+
+class DummyERPBinding(models.Model):
+    _name = 'dummy.erp.binding'
+    _description = 'Dummy ERP Binding'
+
+    """
+    Link between a record in Odoo and its counterpart in the remote Dummy ERP of an integration. It is the indexed
+    source for resolving remote ids to local records and the other way around.
+    """
+
+    integration_id = fields.Many2one(
+        "dummy.erp.integration", "Dummy ERP Integration", required=1, ondelete="cascade"
+    )
+    res_model = fields.Char("Model", required=1)
+    res_id = fields.Many2oneReference("Record ID", model_field="res_model", required=1)
+    dummy_erp_id = fields.Integer("ID In Dummy ERP", required=1)
+    company_id = fields.Many2one(related="integration_id.company_id", store=1)
+
+    _sql_constraints = [
+        ("dummy_erp_id_uniq", "unique(integration_id, res_model, dummy_erp_id)",
+         "A Dummy ERP record can only be bound once per integration."),
+        ("res_id_uniq", "unique(integration_id, res_model, res_id)",
+         "A record can only be bound once per integration."),
+    ]
+
+    @api.model
+    def _get_local_ids(self, integration_id, res_model, dummy_erp_ids):
+        """
+        Resolve the local record ids of the given remote ids with a single query on the unique index, bindings of
+        deleted records are ignored.
+        :param integration_id: dummy.erp.integration object
+        :param res_model: name of the bound model
+        :param dummy_erp_ids: list of remote ids
+        :return: dict mapping remote ids to local record ids
+        """
+        if not dummy_erp_ids:
+            return {}
+        bindings = self.sudo().search_read([
+            ("integration_id", "=", integration_id.id),
+            ("res_model", "=", res_model),
+            ("dummy_erp_id", "in", list(dummy_erp_ids)),
+        ], ["dummy_erp_id", "res_id"])
+        existing_ids = set(self.env[res_model].browse([binding["res_id"] for binding in bindings]).exists().ids)
+        return {
+            binding["dummy_erp_id"]: binding["res_id"] for binding in bindings if binding["res_id"] in existing_ids
+        }
+
+    @api.model
+    def _read_bound_records(self, integration_id, res_model, dummy_erp_ids, field_names):
+        """
+        Read the given fields of the local records bound to the given remote ids
+        :param integration_id: dummy.erp.integration object
+        :param res_model: name of the bound model
+        :param dummy_erp_ids: list of remote ids
+        :param field_names: list of field names to read
+        :return: dict mapping remote ids to the read values (with the local id)
+        """
+        local_ids = self._get_local_ids(integration_id, res_model, dummy_erp_ids)
+        records = self.env[res_model].with_context(active_test=False).browse(local_ids.values())
+        values_by_id = {values["id"]: values for values in records.read(field_names)}
+        return {dummy_erp_id: values_by_id[res_id] for dummy_erp_id, res_id in local_ids.items()}
+
+    @api.model
+    def _bind(self, integration_id, res_model, pairs):
+        """
+        Bind local records to remote ids, the existing bindings of these remote ids or records are replaced.
+        :param integration_id: dummy.erp.integration object
+        :param res_model: name of the bound model
+        :param pairs: iterable of (remote id, local record id) tuples
+        :return: None
+        """
+        pairs = dict(pairs)
+        if not pairs:
+            return
+        existing_bindings = self.sudo().search([
+            ("integration_id", "=", integration_id.id),
+            ("res_model", "=", res_model),
+            "|",
+            ("dummy_erp_id", "in", list(pairs)),
+            ("res_id", "in", list(pairs.values())),
+        ])
+        outdated_bindings = existing_bindings.filtered(
+            lambda binding: pairs.get(binding.dummy_erp_id) != binding.res_id
+        )
+        outdated_bindings.unlink()
+        bound_pairs = {
+            (binding.dummy_erp_id, binding.res_id) for binding in existing_bindings - outdated_bindings
+        }
+        self.sudo().create([{
+            "integration_id": integration_id.id,
+            "res_model": res_model,
+            "res_id": res_id,
+            "dummy_erp_id": dummy_erp_id,
+        } for dummy_erp_id, res_id in pairs.items() if (dummy_erp_id, res_id) not in bound_pairs])
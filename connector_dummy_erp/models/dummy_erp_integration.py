@@ -1,23 +1,63 @@
+import gzip
+import json
+import logging
+import secrets
+import threading
+import time
+import zlib
+from datetime import timedelta
+from itertools import islice
+
 from odoo import models, fields, api, _
 
 from odoo.exceptions import ValidationError
+from odoo.addons.base.models.ir_cron import _intervalTypes
 
-from .api_client import perform_request
+from .api_client import (
+    IMAGE_STATE_FIELDS, fetch_images, get_image_request, get_image_vals, perform_request, perform_requests
+)
+from .bulk_tools import group_writes
+from .json_tools import decode_json, iter_json_array
+from .sync_metrics import COUNTERS, PHASES, collect, count, span
 
-# Define path for each operation, we set limit=0 to get all
-# records since they are not too much in this case; implementing
-# pagination and resource limiting will be useless.
+# Define path for each operation, products and users are paginated with limit/skip (a limit of 0 returns all the
+# records at once), user carts are still fetched at once since they are few per user.
 DUMMY_JSON_PATHS = {
     "test": "/test",
-    "get_products": "/products?limit=0",
+    "get_products": "/products?limit=%s&skip=%s",
+    "get_product": "/products/%s",
+    "get_user": "/users/%s",
+    "get_cart": "/carts/%s",
     "get_user_carts": "/users/%s/carts?limit=0",
-    "get_users": "/users?limit=0",
+    "get_users": "/users?limit=%s&skip=%s",
     "update_cart": "/carts",
     "add_cart": "/carts/add",
     "update_product": "/products",
     "add_product": "/products/add"
 }
 
+# Interval of the import jobs, when webhooks are enabled they only reconcile the missed changes every few hours
+IMPORT_INTERVAL_MINUTES = 20
+
+# Backoff of records failing to be exported: the delay doubles after each failure, starting from the export cron
+# interval and capped to one day
+EXPORT_RETRY_BASE_DELAY = timedelta(minutes=2)
+EXPORT_RETRY_MAX_DELAY = timedelta(days=1)
+
+# Streamed imports read the body by chunks of this size (bytes) and import the records by batches of this size
+IMPORT_STREAM_CHUNK_SIZE = 64 * 1024
+IMPORT_STREAM_BATCH_SIZE = 100
+
+# Models whose images can be downloaded in the background, and number of images hydrated per commit
+IMAGE_HYDRATION_MODELS = ["product.template", "res.users"]
+IMAGE_HYDRATION_BATCH_SIZE = 50
+
+# Bounds of the log entries: details are truncated and only a small sample of the payload is kept in the details
+LOG_DETAILS_MAX_LENGTH = 4000
+LOG_SAMPLE_SIZE = 3
+
+_logger = logging.getLogger(__name__)
+
 
 class DummyERPIntegration(models.Model):
     _name = 'dummy.erp.integration'
@@ -56,6 +96,8 @@ class DummyERPIntegration(models.Model):
     )
     cron_count = fields.Integer("Jobs", compute="_compute_cron_count")
     integration_log_ids = fields.One2many("dummy.erp.integration.log", "integration_id")
+    job_ids = fields.One2many("dummy.erp.job", "integration_id", "Job Runs")
+    outbox_count = fields.Integer("Queued Changes", compute="_compute_outbox_count")
 
     # Business logic fields
     pricelist_id = fields.Many2one("product.pricelist", "Pricelist", default=_default_pricelist, tracking=True)
@@ -63,6 +105,71 @@ class DummyERPIntegration(models.Model):
     default_tax_ids = fields.Many2many("account.tax", string="Default Taxes", domain=[('type_tax_use', '=', 'sale')],
                                        tracking=True)
 
+    # Pagination fields, the cursors hold the offset of the next page to import so an interrupted run resumes from
+    # the last committed page
+    import_page_size = fields.Integer("Import Page Size", default=100, tracking=True,
+                                      help="Number of records fetched per request, 0 fetches all records at once.")
+    import_product_cursor = fields.Integer("Products Import Cursor", default=0, readonly=True, copy=False)
+    import_user_cursor = fields.Integer("Users Import Cursor", default=0, readonly=True, copy=False)
+    import_streaming = fields.Boolean("Stream Imported Pages", default=False,
+                                      help="Decode the imported pages while they are received and import their records "
+                                           "by batches, it keeps the memory low when large pages are fetched.")
+    image_fetch_workers = fields.Integer("Image Download Workers", default=8,
+                                         help="Number of images of an imported page downloaded concurrently.")
+    defer_image_download = fields.Boolean("Download Images in Background", default=False, tracking=True,
+                                          help="Import the records with the URL of their image only, the images are "
+                                               "downloaded afterwards by a background job.")
+    image_hydration_per_minute = fields.Integer("Background Images per Minute", default=600,
+                                                help="Maximum number of images downloaded per minute by the background "
+                                                     "job, 0 pauses the background downloads.")
+
+    # HTTP connection fields
+    http_pool_size = fields.Integer("Connection Pool Size", default=10,
+                                    help="Maximum number of kept-alive connections per host.")
+    http_connect_timeout = fields.Float("Connect Timeout (s)", default=5.0)
+    http_read_timeout = fields.Float("Read Timeout (s)", default=30.0)
+    http_max_retries = fields.Integer("Max Retries", default=3,
+                                      help="Retries of failed idempotent requests (GET, PUT, ..), POST is not retried.")
+    http_backoff_factor = fields.Float("Retry Backoff Factor", default=0.5,
+                                       help="Retries wait backoff factor * 2 ^ (retry number - 1) seconds.")
+
+    export_concurrency = fields.Integer("Export Concurrency", default=8,
+                                        help="Maximum number of export requests sent at the same time.")
+
+    cart_sync_freshness_minutes = fields.Integer("Carts Sync Freshness (Minutes)", default=5,
+                                                 help="Carts are not fetched again when the user logs in within this "
+                                                      "delay after the last sync, 0 fetches them at every log in.")
+
+    export_batch_size = fields.Integer("Export Batch Size", default=500,
+                                       help="Maximum number of queued changes exported by one run, oldest first.")
+    export_unbound_records = fields.Boolean("Export Unbound Records", default=False, tracking=True,
+                                            help="Export the changes of the records not linked to any integration, "
+                                                 "the integration of the record company is preferred.")
+
+    job_max_backoff = fields.Integer("Idle Backoff Factor", default=4,
+                                     help="When a job finds nothing to do, its interval doubles after each idle run "
+                                          "up to this factor, 1 disables the backoff.")
+
+    # Webhook fields, the remote changes are pushed to the webhook URL signed with the secret
+    webhook_enabled = fields.Boolean("Receive Webhooks", default=False, tracking=True,
+                                     help="Apply the changes pushed by the remote ERP, the import jobs then run at "
+                                          "the reconciliation interval to catch up on missed notifications.")
+    webhook_secret = fields.Char("Webhook Secret", copy=False, required=True,
+                                 default=lambda self: secrets.token_urlsafe(32),
+                                 help="Key of the HMAC-SHA256 signature of the notifications. The digest of "
+                                      "<timestamp>.<body> is sent in the X-Dummy-ERP-Signature header as "
+                                      "sha256=<hex digest>, with the UNIX timestamp in the X-Dummy-ERP-Timestamp "
+                                      "header.")
+    webhook_url = fields.Char("Webhook URL", compute="_compute_webhook_url")
+    webhook_reconciliation_hours = fields.Integer("Reconciliation Interval (Hours)", default=24, tracking=True)
+
+    # Log fields
+    log_store_payloads = fields.Boolean("Store Full Payloads", default=False,
+                                        help="Store the full payload of each operation as a compressed attachment of "
+                                             "its log entry.")
+    log_retention_days = fields.Integer("Log Retention (Days)", default=30,
+                                        help="Info entries older than this are aggregated per day, 0 keeps them.")
+
     ##################
     # Helper methods
     ##################
@@ -77,22 +184,149 @@ class DummyERPIntegration(models.Model):
         else:
             return self.base_url
 
-    def log_operation(self, subject, details, type):
+    def _get_http_config(self):
+        """
+        Helper method to return the HTTP settings of the integration as plain values, so they can be used by the
+        pooled session outside the ORM (e.g. in download threads).
+        :return: dict: HTTP settings
+        """
+        self.ensure_one()
+        return {
+            "key": (self.env.cr.dbname, self.id),
+            "pool_size": max(self.http_pool_size, 1),
+            "max_retries": max(self.http_max_retries, 0),
+            "backoff_factor": self.http_backoff_factor,
+            "timeout": (self.http_connect_timeout or None, self.http_read_timeout or None),
+        }
+
+    def log_operation(self, subject, details, type, payload=None, record_count=0):
         """
-        Helper method used to create log entries for the integration object with passed parameters
+        Helper method used to create log entries for the integration object with passed parameters, the details are
+        bounded to a summary with a truncated sample of the payload.
         :param subject: Main operation title
         :param details: Long description for the log entry
         :param type: Entry type either error, warning, or info.
+        :param payload: list of records sent or received by the operation, a sample of it is kept in the details and
+        the full payload is stored as a compressed attachment if enabled on the integration
+        :param record_count: number of records processed by the operation
         :return: None
         """
-        self.env["dummy.erp.integration.log"].sudo().create(
+        if payload:
+            sample = json.dumps(payload[:LOG_SAMPLE_SIZE], default=str)
+            details = f"{details}\nSample ({min(len(payload), LOG_SAMPLE_SIZE)} of {len(payload)}): {sample}"
+        if details and len(details) > LOG_DETAILS_MAX_LENGTH:
+            details = f"{details[:LOG_DETAILS_MAX_LENGTH]}... (truncated, {len(details)} characters)"
+        log = self.env["dummy.erp.integration.log"].sudo().create(
             {
                 "integration_id": self.id,
                 "name": subject,
                 "details": details,
                 "type": type,
+                "record_count": record_count or len(payload or []),
             }
         )
+        if payload and self.log_store_payloads:
+            log.payload_attachment_id = self.env["ir.attachment"].sudo().create({
+                "name": f"dummy_erp_log_{log.id}.json.gz",
+                "raw": gzip.compress(json.dumps(payload, default=str).encode()),
+                "mimetype": "application/gzip",
+                "res_model": log._name,
+                "res_id": log.id,
+            })
+
+    def _commit_progress(self):
+        """
+        Helper method to commit the work done so far, so it is not lost if the run gets interrupted afterwards.
+        Commits are skipped while testing since they would break the test transaction.
+        :return: None
+        """
+        if not getattr(threading.current_thread(), "testing", False):
+            self.env.cr.commit()
+
+    def _import_paginated(self, path_key, payload_key, cursor_field, model_name):
+        """
+        Import the records of a paginated endpoint page by page, starting from the stored cursor. The cursor is
+        committed after each page and reset to 0 once the last page is imported.
+        :param path_key: key of the endpoint path in DUMMY_JSON_PATHS
+        :param payload_key: key of the records list in the response, e.g. products
+        :param cursor_field: name of the integration field holding the offset of the next page
+        :param model_name: name of the model implementing create_or_update_from_dummy_erp_payload
+        :return: dict: number of created, updated and skipped (unchanged) records
+        """
+        self.ensure_one()
+        page_size = self.import_page_size
+        skip = self[cursor_field] if page_size > 0 else 0
+        stats = {"created": 0, "updated": 0, "skipped": 0}
+        # Lookup maps (e.g. categories) reused by all the pages of this run
+        cache = {}
+        while True:
+            response = perform_request(
+                self, "GET", {}, DUMMY_JSON_PATHS[path_key] % (max(page_size, 0), skip), stream=self.import_streaming
+            )
+            # Keys of the page other than the records, e.g. total
+            meta = {}
+            page_count = 0
+            try:
+                if not 200 <= response.status_code < 300:
+                    raise ValidationError(
+                        _("Cannot fetch %s from dummy ERP: %s") % (payload_key, response.content)
+                    )
+                for records in self._iter_page_records(response, payload_key, meta):
+                    count("records", len(records))
+                    page_stats = self.env[model_name].create_or_update_from_dummy_erp_payload(self, records, cache)
+                    for key in stats:
+                        stats[key] += page_stats[key]
+                    page_count += len(records)
+            finally:
+                response.close()
+            skip += page_count
+            done = page_size <= 0 or not page_count or skip >= meta.get("total", 0)
+            self[cursor_field] = 0 if done else skip
+            self._commit_progress()
+            if done:
+                if self.defer_image_download:
+                    self.env.ref("connector_dummy_erp.ir_cron_dummy_erp_hydrate_images")._trigger()
+                return stats
+
+    def _iter_page_records(self, response, payload_key, meta):
+        """
+        Helper method to decode the records of an imported page. The page is decoded at once, or by batches while it
+        is received when the import is streamed.
+        :param response: requests.response of the page
+        :param payload_key: key of the records list in the response, e.g. products
+        :param meta: dict filled with the other keys of the page, e.g. total, once all the records were read
+        :return: generator of lists of records
+        """
+        if self.import_streaming:
+            records = iter_json_array(response.iter_content(IMPORT_STREAM_CHUNK_SIZE), payload_key, meta)
+            while True:
+                with span("parse"):
+                    batch = list(islice(records, IMPORT_STREAM_BATCH_SIZE))
+                if not batch:
+                    return
+                yield batch
+        else:
+            with span("parse"):
+                data = decode_json(response.content)
+            meta["total"] = data.get("total", 0)
+            if data.get(payload_key):
+                yield data[payload_key]
+
+    def _update_import_schedule(self):
+        """
+        Helper method to set the interval of the import jobs, they become a slow reconciliation when webhooks are
+        enabled. The idle backoff of the import jobs is reset since it no longer applies to the new interval.
+        :return: None
+        """
+        for rec in self:
+            rec.job_ids.filtered(lambda state: state.job.startswith("import_")).write({
+                "idle_runs": 0, "skip_until": False
+            })
+            if rec.webhook_enabled:
+                vals = {"interval_number": max(rec.webhook_reconciliation_hours, 1), "interval_type": "hours"}
+            else:
+                vals = {"interval_number": IMPORT_INTERVAL_MINUTES, "interval_type": "minutes"}
+            (rec.import_product_cron_id | rec.import_user_cron_id).sudo().write(vals)
 
     ######################
     # View records methods
@@ -106,6 +340,26 @@ class DummyERPIntegration(models.Model):
         for rec in self:
             rec.cron_count = len(rec.cron_ids)
 
+    def _compute_webhook_url(self):
+        base_url = self.env["ir.config_parameter"].sudo().get_param("web.base.url")
+        for rec in self:
+            rec.webhook_url = rec.id and f"{base_url}/dummy_erp/webhook/{rec.id}"
+
+    def _compute_outbox_count(self):
+        outbox_data = self.env["dummy.erp.outbox"].sudo()._read_group(
+            [("integration_id", "in", self.ids)], ["integration_id"], ["integration_id"]
+        )
+        counts = {data["integration_id"][0]: data["integration_id_count"] for data in outbox_data}
+        for rec in self:
+            rec.outbox_count = counts.get(rec.id, 0)
+
+    def action_view_outbox(self):
+        action = self.env["ir.actions.actions"]._for_xml_id(
+            "connector_dummy_erp.act_window_dummy_erp_outbox"
+        )
+        action.update({"domain": [("integration_id", "=", self.id)]})
+        return action
+
     def action_view_log(self):
         action = self.env["ir.actions.actions"]._for_xml_id(
             "connector_dummy_erp.act_window_dummy_erp_log"
@@ -126,6 +380,7 @@ class DummyERPIntegration(models.Model):
         res._create_dummy_erp_user_importer()
         res._create_dummy_erp_cart_exporter()
         res._create_dummy_erp_product_exporter()
+        res._update_import_schedule()
         return res
 
     # Override write to change cron active status based on integration automation fields
@@ -139,6 +394,10 @@ class DummyERPIntegration(models.Model):
             self.export_cart_cron_id.active = vals['auto_export_cart']
         if 'auto_export_product' in vals:
             self.export_product_cron_id.active = vals['auto_export_product']
+        if vals.get('export_unbound_records') or vals.get('active'):
+            self.env["dummy.erp.outbox"]._route_unbound()
+        if 'webhook_enabled' in vals or 'webhook_reconciliation_hours' in vals:
+            self._update_import_schedule()
         return res
 
     # Override toggle active to deactivate/activate all automation fields based on integration status
@@ -161,7 +420,8 @@ class DummyERPIntegration(models.Model):
         """
         try:
             response = perform_request(self, "GET", {}, DUMMY_JSON_PATHS["test"])
-            if 200 <= response.status_code < 300 and response.json()["status"]:
+            data = decode_json(response.content)
+            if 200 <= response.status_code < 300 and data["status"]:
                 message = _("Connection Test Successful!")
                 self.log_operation(
                     _("Test Connection"),
@@ -177,8 +437,8 @@ class DummyERPIntegration(models.Model):
                         "sticky": False,
                     },
                 }
-            elif response.json()["status"] == "error":
-                message = response.json()["message"]["description"]
+            elif data["status"] == "error":
+                message = data["message"]["description"]
                 self.log_operation(
                     _("Test Connection"),
                     message,
@@ -206,7 +466,7 @@ class DummyERPIntegration(models.Model):
             dict(
                 name=f"Dummy ERP Integration {self.name}: Import Products",
                 model_id=model_id.id,
-                interval_number=20,
+                interval_number=IMPORT_INTERVAL_MINUTES,
                 interval_type="minutes",
                 active=False,
                 numbercall=-1,
@@ -226,7 +486,7 @@ class DummyERPIntegration(models.Model):
             dict(
                 name=f"Dummy ERP Integration {self.name}: Import Users",
                 model_id=model_id.id,
-                interval_number=20,
+                interval_number=IMPORT_INTERVAL_MINUTES,
                 interval_type="minutes",
                 active=False,
                 numbercall=-1,
@@ -277,6 +537,97 @@ class DummyERPIntegration(models.Model):
         self.export_product_cron_id = cron_id.id
         cron_id.dummy_erp_integration_id = self
 
+    ##########################
+    # Job scheduling methods
+    ##########################
+    @api.model
+    def _run_job(self, integration_id, job, method_name):
+        """
+        Run a job of the integration unless it is backing off or another run of the same job holds its lock. The
+        lock is a session level advisory lock, so it is kept across the commits of the run and covers the manual
+        triggers as well as the scheduled runs.
+        :param integration_id: dummy.erp.integration id
+        :param job: job key, e.g. import_product
+        :param method_name: name of the integration method running the job, it returns the number of processed
+        records and the remaining backlog
+        :return: None
+        """
+        integration = self.with_context(active_test=False).search([("id", "=", integration_id)])
+        if not integration:
+            return
+        lock_key = zlib.crc32(f"dummy_erp_{job}".encode()) & 0x7FFFFFFF
+        self.env.cr.execute("SELECT pg_try_advisory_lock(%s, %s)", (lock_key, integration.id))
+        if not self.env.cr.fetchone()[0]:
+            _logger.info("Skipping job %s of integration %s, a previous run is in progress", job, integration.id)
+            return
+        try:
+            state = self.env["dummy.erp.job"]._get_job(integration, job)
+            if state.skip_until and state.skip_until > fields.Datetime.now():
+                return
+            with collect() as metrics:
+                processed, backlog = getattr(integration, method_name)()
+            integration._schedule_job(state, processed, backlog, metrics.duration)
+            integration._store_run(job, metrics)
+            integration._commit_progress()
+        except Exception:
+            # The lock cannot be released in an aborted transaction
+            self.env.cr.rollback()
+            raise
+        finally:
+            self.env.cr.execute("SELECT pg_advisory_unlock(%s, %s)", (lock_key, integration.id))
+
+    def _schedule_job(self, state, processed, backlog, duration):
+        """
+        Record the run statistics of the job and adapt its next run: a job with a remaining backlog runs again as soon
+        as possible, a job which found nothing to do skips its next runs with an exponential backoff. The import jobs
+        do not back off while webhooks are enabled, they already run at the slow reconciliation interval.
+        :param state: dummy.erp.job object
+        :param processed: number of records processed by the run
+        :param backlog: number of records left to process
+        :param duration: duration of the run in seconds
+        :return: None
+        """
+        self.ensure_one()
+        now = fields.Datetime.now()
+        vals = {
+            "last_run": now,
+            "last_duration": duration,
+            "last_processed": processed,
+            "last_backlog": backlog,
+        }
+        cron = state.cron_id.sudo()
+        reconciliation = self.webhook_enabled and state.job.startswith("import_")
+        if processed or backlog or not cron or reconciliation:
+            vals.update(idle_runs=0, skip_until=False)
+        else:
+            idle_runs = state.idle_runs + 1
+            skipped_intervals = min(2 ** idle_runs, max(self.job_max_backoff, 1)) - 1
+            vals["idle_runs"] = idle_runs
+            vals["skip_until"] = skipped_intervals and (
+                now + _intervalTypes[cron.interval_type](cron.interval_number) * skipped_intervals
+            )
+        state.write(vals)
+        if backlog and cron:
+            cron._trigger()
+
+    def _store_run(self, job, metrics):
+        """
+        Store the phase timings and counters collected during a run of the job
+        :param job: job key, e.g. import_product
+        :param metrics: SyncMetrics of the run
+        :return: None
+        """
+        self.ensure_one()
+        vals = {
+            "integration_id": self.id,
+            "job": job,
+            "started_at": metrics.started_at,
+            "duration": metrics.duration,
+        }
+        vals.update({f"{phase}_time": metrics.spans.get(phase, 0.0) for phase in PHASES})
+        vals.update({f"{name}_count": metrics.counters.get(name, 0) for name in COUNTERS})
+        self.env["dummy.erp.sync.run"].sudo().create(vals)
+
     ##########################
     # Business Logic methods: Importers
     ##########################
@@ -287,25 +638,29 @@ class DummyERPIntegration(models.Model):
         :param integration_id: dummy.erp.integration object
         :return: None
         """
-        integration = self.with_context(active_test=False).search([("id", "=", integration_id)])
+        self._run_job(integration_id, "import_product", "_import_dummy_products")
+
+    def _import_dummy_products(self):
+        """
+        Run the products import of the integration
+        :return: tuple of the number of created or updated records and the remaining backlog
+        """
+        integration = self
         try:
-            response = perform_request(integration, "GET", {}, DUMMY_JSON_PATHS["get_products"])
-            if (
-                    200 <= response.status_code < 300
-                    and "products" in response.json()
-                    and len(response.json()["products"]) > 0
-            ):
-                payload = response.json()["products"]
-                self.env["product.template"].create_or_update_from_dummy_erp_payload(
-                    integration, payload
-                )
+            stats = integration._import_paginated(
+                "get_products", "products", "import_product_cursor", "product.template"
+            )
+            if any(stats.values()):
                 integration.log_operation(
                     _("Import Products"),
                     (
-                        f"Products batch imported successfully {response.json()['products']}"
+                        f"Products imported successfully: {stats['created']} created, {stats['updated']} updated, "
+                        f"{stats['skipped']} skipped (unchanged)"
                     ),
                     "info",
+                    record_count=sum(stats.values()),
                 )
+            return stats["created"] + stats["updated"], 0
 
         except Exception as exc:
             integration.log_operation(
@@ -313,6 +668,8 @@ class DummyERPIntegration(models.Model):
                 (f"Exception: {str(exc)}"),
                 "error",
             )
+            count("errors")
+            return 0, 0
 
     @api.model
     def import_dummy_users(self, integration_id):
@@ -321,25 +678,29 @@ class DummyERPIntegration(models.Model):
         :param integration_id: dummy.erp.integration object
         :return: None
         """
-        integration = self.with_context(active_test=False).search([("id", "=", integration_id)])
+        self._run_job(integration_id, "import_user", "_import_dummy_users")
+
+    def _import_dummy_users(self):
+        """
+        Run the users import of the integration
+        :return: tuple of the number of created or updated records and the remaining backlog
+        """
+        integration = self
         try:
-            response = perform_request(integration, "GET", {}, DUMMY_JSON_PATHS["get_users"])
-            if (
-                    200 <= response.status_code < 300
-                    and "users" in response.json()
-                    and len(response.json()["users"]) > 0
-            ):
-                payload = response.json()["users"]
-                self.env["res.users"].create_or_update_from_dummy_erp_payload(
-                    integration, payload
-                )
+            stats = integration._import_paginated(
+                "get_users", "users", "import_user_cursor", "res.users"
+            )
+            if any(stats.values()):
                 integration.log_operation(
                     _("Import Users"),
                     (
-                        f"Users batch imported successfully {response.json()['users']}"
+                        f"Users imported successfully: {stats['created']} created, {stats['updated']} updated, "
+                        f"{stats['skipped']} skipped (unchanged)"
                     ),
                     "info",
+                    record_count=sum(stats.values()),
                 )
+            return stats["created"] + stats["updated"], 0
 
         except Exception as exc:
             integration.log_operation(
@@ -347,10 +708,109 @@ class DummyERPIntegration(models.Model):
                 (f"Exception: {str(exc)}"),
                 "error",
             )
+            count("errors")
+            return 0, 0
 
     ##########################
     # Business Logic methods: Exporters
     ##########################
+    def _export_to_dummy_erp(self, model_name, export_requests):
+        """
+        Send the export requests concurrently then write back the results in batch: all the exported records are
+        unmarked and bound to the integration with a single write and leave the outbox, only the records which got a
+        new dummy ERP id are written one by one. Failed records are postponed with an exponential backoff without
+        blocking the others.
+        :param model_name: name of the exported model
+        :param export_requests: list of (record, method, path, payload) tuples
+        :return: list of (record, error message, next retry date) tuples for the failed requests
+        """
+        count("records", len(export_requests))
+        responses = perform_requests(self, [
+            (record.id, method, path, payload) for record, method, path, payload in export_requests
+        ])
+        exported_ids = []
+        new_dummy_erp_ids = {}
+        failures = []
+        for record, method, path, payload in export_requests:
+            response = responses[record.id]
+            if isinstance(response, Exception):
+                failures.append((record, str(response)))
+                continue
+            try:
+                with span("parse"):
+                    data = decode_json(response.content)
+            except ValueError:
+                data = {}
+            if 200 <= response.status_code < 300 and "id" in data:
+                exported_ids.append(record.id)
+                if record.dummy_erp_id != data["id"]:
+                    new_dummy_erp_ids[record.id] = data["id"]
+            else:
+                failures.append((record, str(response.content)))
+
+        with span("write"):
+            records = self.env[model_name].browse(exported_ids).with_context(do_not_update_dummy_erp=True)
+            if records:
+                records.write({
+                    "dummy_erp_integration_id": self.id,
+                    "update_to_dummy_erp": False,
+                    "dummy_erp_export_failures": 0,
+                    "dummy_erp_export_error": False,
+                })
+            self.env["dummy.erp.outbox"]._dequeue(model_name, exported_ids)
+            for record_id, dummy_erp_id in new_dummy_erp_ids.items():
+                records.browse(record_id).write({"dummy_erp_id": dummy_erp_id})
+            self.env["dummy.erp.binding"]._bind(self, model_name, [
+                (records.browse(record_id).dummy_erp_id, record_id) for record_id in exported_ids
+            ])
+            retry_dates = self._postpone_failed_exports(model_name, failures)
+            self.env.flush_all()
+        return [(record, error, retry_dates[record.id]) for record, error in failures]
+
+    def _postpone_failed_exports(self, model_name, failures):
+        """
+        Increase the failure counter of the records which failed to be exported and postpone their next retry
+        :param model_name: name of the exported model
+        :param failures: list of (record, error message) tuples
+        :return: dict mapping the failed record ids to their next retry date
+        """
+        now = fields.Datetime.now()
+        vals_by_id = {}
+        retry_dates = {}
+        for record, error in failures:
+            failure_count = record.dummy_erp_export_failures + 1
+            delay = min(EXPORT_RETRY_BASE_DELAY * 2 ** (failure_count - 1), EXPORT_RETRY_MAX_DELAY)
+            vals_by_id[record.id] = {
+                "dummy_erp_export_failures": failure_count,
+                "dummy_erp_export_error": error,
+            }
+            retry_dates[record.id] = now + delay
+        records = self.env[model_name].with_context(do_not_update_dummy_erp=True)
+        for vals, record_ids in group_writes(vals_by_id):
+            records.browse(record_ids).write(vals)
+        self.env["dummy.erp.outbox"]._postpone(model_name, retry_dates)
+        return retry_dates
+
+    def _log_export_summary(self, subject, export_requests, failures):
+        """
+        Log a single entry summarizing an export run
+        :param subject: Main operation title
+        :param export_requests: list of (record, method, path, payload) tuples sent by the run
+        :param failures: list of (record, error message, next retry date) tuples
+        :return: None
+        """
+        exported_count = len(export_requests) - len(failures)
+        details = f"{exported_count} records successfully updated in dummy ERP, {len(failures)} failed."
+        if failures:
+            details += "\n" + "\n".join(
+                f"{record.display_name} (failure {record.dummy_erp_export_failures}, next retry {retry_at}): {error}"
+                for record, error, retry_at in failures
+            )
+        self.log_operation(
+            subject, details, "warning" if failures else "info",
+            payload=[payload for record, method, path, payload in export_requests],
+        )
+
     @api.model
     def export_dummy_products(self, integration_id):
         """
@@ -358,9 +818,20 @@ class DummyERPIntegration(models.Model):
         :param integration_id: dummy.erp.integration object
         :return: None
         """
-        integration = self.with_context(active_test=False).search([("id", "=", integration_id)])
-        products = self.env["product.template"].get_products_to_update()
+        self._run_job(integration_id, "export_product", "_export_dummy_products")
+
+    def _export_dummy_products(self):
+        """
+        Run the products export of the integration
+        :return: tuple of the number of exported records and the remaining backlog
+        """
+        integration = self
+        with span("prepare"):
+            products = self.env["product.template"].get_products_to_update(
+                integration, integration.export_batch_size or None
+            )
         try:
+            export_requests = []
             for product in products:
                 payload = product
                 product_obj = payload.pop("product_obj")
@@ -370,27 +841,21 @@ class DummyERPIntegration(models.Model):
                 else:
                     path = DUMMY_JSON_PATHS["add_product"]
                     method = "POST"
-                response = perform_request(integration, method, payload, path)
-                if 200 <= response.status_code < 300 and "id" in response.json():
-                    product_obj.with_context(do_not_update_dummy_erp=True).write({
-                        "dummy_erp_id": response.json()['id'],
-                        "update_to_dummy_erp": False
-                    })
-                else:
-                    raise ValidationError(
-                        f"Cannot update product {product_obj.name} in dummy ERP"
-                    )
-            integration.log_operation(
-                _("Update products in dummy ERP"),
-                f"Products successfully updated in dummy ERP with payload: {str(products)}",
-                "info",
-            )
+                export_requests.append((product_obj, method, path, payload))
+            failures = integration._export_to_dummy_erp("product.template", export_requests)
+            if export_requests:
+                integration._log_export_summary(
+                    _("Update products in dummy ERP"), export_requests, failures
+                )
+            return len(export_requests), self.env["dummy.erp.outbox"]._count_pending("product.template", integration)
         except Exception as exc:
             integration.log_operation(
                 _("Update products in dummy ERP"),
                 (f"Exception: {str(exc)}"),
                 "error",
             )
+            count("errors")
+            return 0, 0
 
     @api.model
     def export_dummy_carts(self, integration_id):
@@ -399,9 +864,18 @@ class DummyERPIntegration(models.Model):
         :param integration_id: dummy.erp.integration object
         :return: None
         """
-        integration = self.with_context(active_test=False).search([("id", "=", integration_id)])
-        carts = self.env["sale.order"].get_carts_to_update()
+        self._run_job(integration_id, "export_cart", "_export_dummy_carts")
+
+    def _export_dummy_carts(self):
+        """
+        Run the carts export of the integration
+        :return: tuple of the number of exported records and the remaining backlog
+        """
+        integration = self
+        with span("prepare"):
+            carts = self.env["sale.order"].get_carts_to_update(integration, integration.export_batch_size or None)
         try:
+            export_requests = []
             for cart in carts:
                 payload = cart
                 cart_obj = payload.pop("cart_obj")
@@ -413,24 +887,90 @@ class DummyERPIntegration(models.Model):
                     path = DUMMY_JSON_PATHS["add_cart"]
                     method = "POST"
                 payload.pop("id")
-                response = perform_request(integration, method, payload, path)
-                if 200 <= response.status_code < 300 and "id" in response.json():
-                    cart_obj.with_context(do_not_update_dummy_erp=True).write({
-                        "dummy_erp_id": response.json()['id'],
-                        "update_to_dummy_erp": False
-                    })
-                else:
-                    raise ValidationError(
-                        f"Cannot update cart {cart_obj.name} in dummy ERP: {response.content}"
-                    )
-            integration.log_operation(
-                _("Update carts in dummy ERP"),
-                f"Carts successfully updated in dummy ERP with payload: {str(carts)}",
-                "info",
-            )
+                export_requests.append((cart_obj, method, path, payload))
+            failures = integration._export_to_dummy_erp("sale.order", export_requests)
+            if export_requests:
+                integration._log_export_summary(
+                    _("Update carts in dummy ERP"), export_requests, failures
+                )
+            return len(export_requests), self.env["dummy.erp.outbox"]._count_pending("sale.order", integration)
         except Exception as exc:
             integration.log_operation(
                 _("Update carts in dummy ERP"),
                 (f"Exception: {str(exc)}"),
                 "error",
             )
+            count("errors")
+            return 0, 0
+
+    ##########################
+    # Business Logic methods: Images
+    ##########################
+    @api.model
+    def _cron_hydrate_images(self):
+        """
+        Download the pending images of the imported records of each integration. Each run downloads at most the images
+        per minute of the integration and an integration is skipped when its last download run started less than a
+        minute ago, whatever triggered the job. The job triggers itself again a minute later while images remain
+        pending.
+        :return: None
+        """
+        backlog = False
+        last_runs = {
+            run["integration_id"]: run["started_at"] for run in self.env["dummy.erp.sync.run"].sudo()._get_last_runs()
+            if run["job"] == "hydrate_images"
+        }
+        window_start = time.time() - 60
+        for integration in self.search([("image_hydration_per_minute", ">", 0)]):
+            if last_runs.get(integration.id, 0) > window_start:
+                backlog = True
+                continue
+            with collect() as metrics:
+                backlog = integration._hydrate_images(integration.image_hydration_per_minute) or backlog
+            if metrics.counters:
+                integration._store_run("hydrate_images", metrics)
+                integration._commit_progress()
+        if backlog:
+            self.env.ref("connector_dummy_erp.ir_cron_dummy_erp_hydrate_images")._trigger(
+                fields.Datetime.now() + timedelta(minutes=1)
+            )
+
+    def _hydrate_images(self, limit):
+        """
+        Download the pending images of the records imported by the integration, the work is committed after each
+        batch. Failed downloads leave the record without pending image and clear its payload fingerprint, so the next
+        import queues the image again.
+        :param limit: maximum number of images to download
+        :return: bool: True if images remain pending
+        """
+        self.ensure_one()
+        if limit <= 0:
+            return False
+        for model_name in IMAGE_HYDRATION_MODELS:
+            model = self.env[model_name].sudo().with_context(active_test=False, do_not_update_dummy_erp=True)
+            while limit > 0:
+                records = model.search([
+                    ("dummy_erp_integration_id", "=", self.id), ("dummy_erp_image_pending", "=", True)
+                ], limit=min(limit, IMAGE_HYDRATION_BATCH_SIZE))
+                if not records:
+                    break
+                limit -= len(records)
+                states = {state["id"]: state for state in records.read(IMAGE_STATE_FIELDS)}
+                images = fetch_images(self, {
+                    record_id: get_image_request(state["dummy_erp_image_url"], state)
+                    for record_id, state in states.items()
+                })
+                count("records", len(records))
+                with span("write"):
+                    for record in records:
+                        state = states[record.id]
+                        vals = get_image_vals(state["dummy_erp_image_url"], images[record.id], state)
+                        record.write(vals or {"dummy_erp_image_pending": False, "dummy_erp_payload_hash": False})
+                    self.env.flush_all()
+                self._commit_progress()
+        return limit <= 0 and any(
+            self.env[model_name].sudo().with_context(active_test=False).search_count([
+                ("dummy_erp_integration_id", "=", self.id), ("dummy_erp_image_pending", "=", True)
+            ], limit=1)
+            for model_name in IMAGE_HYDRATION_MODELS
+        )
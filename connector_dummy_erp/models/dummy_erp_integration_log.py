@@ -1,4 +1,7 @@
-from odoo import models, fields
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import sql
 
 
 class DummyERPIntegrationLog(models.Model):
@@ -20,3 +23,66 @@ class DummyERPIntegrationLog(models.Model):
         [("info", "Info"), ("warning", "Warning"), ("error", "Error")]
     )
     company_id = fields.Many2one(related="integration_id.company_id", store=1)
+    record_count = fields.Integer("Records")
+    # Full payload of the operation, stored as a gzip compressed JSON attachment when enabled on the integration
+    payload_attachment_id = fields.Many2one("ir.attachment", "Payload", ondelete="set null")
+    # Daily aggregate of old info entries, created by the log compaction
+    is_rollup = fields.Boolean("Daily Rollup", default=False)
+
+    def init(self):
+        # The log is always browsed per integration from the most recent entries
+        sql.create_index(
+            self._cr, "dummy_erp_integration_log_integration_id_create_date_index", self._table,
+            ["integration_id", "create_date"]
+        )
+
+    def unlink(self):
+        attachments = self.payload_attachment_id
+        res = super(DummyERPIntegrationLog, self).unlink()
+        attachments.unlink()
+        return res
+
+    @api.model
+    def _cron_compact_logs(self):
+        """
+        Aggregate the info entries older than the retention of their integration into one rollup entry per day and
+        subject, the aggregated entries are deleted with their payloads. Sync run metrics and applied webhook events
+        older than the retention are deleted.
+        :return: None
+        """
+        integrations = self.env["dummy.erp.integration"].with_context(active_test=False).search([
+            ("log_retention_days", ">", 0)
+        ])
+        for integration in integrations:
+            limit_date = fields.Datetime.now() - timedelta(days=integration.log_retention_days)
+            self.env["dummy.erp.sync.run"].sudo().search([
+                ("integration_id", "=", integration.id), ("started_at", "<", limit_date)
+            ]).unlink()
+            self.env["dummy.erp.webhook.event"].sudo().search([
+                ("integration_id", "=", integration.id), ("state", "=", "done"), ("received_at", "<", limit_date)
+            ]).unlink()
+            self.env.cr.execute("""
+                SELECT name, date_trunc('day', create_date) AS day, count(*), sum(coalesce(record_count, 0)),
+                       array_agg(id)
+                FROM dummy_erp_integration_log
+                WHERE integration_id = %s AND type = 'info' AND NOT coalesce(is_rollup, false) AND create_date < %s
+                GROUP BY name, day
+            """, (integration.id, limit_date))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                continue
+            rollups = self.sudo().create([{
+                "integration_id": integration.id,
+                "name": name,
+                "details": f"{count} entries aggregated for {day.date()}",
+                "type": "info",
+                "record_count": record_count,
+                "is_rollup": True,
+            } for name, day, count, record_count, log_ids in rows])
+            # Keep the rollups at the date of the entries they replace
+            for rollup, (name, day, count, record_count, log_ids) in zip(rollups, rows):
+                self.env.cr.execute(
+                    "UPDATE dummy_erp_integration_log SET create_date = %s WHERE id = %s", (day, rollup.id)
+                )
+            self.sudo().browse([log_id for row in rows for log_id in row[4]]).unlink()
+            self.invalidate_model(["create_date"])
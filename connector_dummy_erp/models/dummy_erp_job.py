@@ -0,0 +1,53 @@
+from odoo import models, fields, api
+
+JOB_SELECTION = [
+    ("import_product", "Import Products"),
+    ("import_user", "Import Users"),
+    ("export_product", "Export Products"),
+    ("export_cart", "Export Carts"),
+]
+
+
+class DummyERPJob(models.Model):
+    _name = 'dummy.erp.job'
+    _description = 'Dummy ERP Job'
+    _order = "integration_id, job"
+
+    """
+    Run state of the scheduled jobs of an integration. It is kept apart from ir.cron because the cron row is locked by
+    the scheduler while the job runs.
+    """
+
+    integration_id = fields.Many2one("dummy.erp.integration", "Dummy ERP Integration", required=1,
+                                     ondelete="cascade")
+    job = fields.Selection(JOB_SELECTION, string="Job", required=1)
+    cron_id = fields.Many2one("ir.cron", "Scheduled Action", compute="_compute_cron_id")
+    last_run = fields.Datetime("Last Run", readonly=True)
+    last_duration = fields.Float("Last Duration (s)", readonly=True)
+    last_processed = fields.Integer("Last Processed", readonly=True,
+                                    help="Number of records created, updated or exported by the last run.")
+    last_backlog = fields.Integer("Backlog", readonly=True,
+                                  help="Number of records left to process after the last run.")
+    idle_runs = fields.Integer("Idle Runs", readonly=True,
+                               help="Number of consecutive runs which found nothing to do.")
+    skip_until = fields.Datetime("Backing Off Until", readonly=True)
+
+    _sql_constraints = [
+        ("job_uniq", "unique(integration_id, job)", "An integration can only have one state per job."),
+    ]
+
+    @api.depends("integration_id", "job")
+    def _compute_cron_id(self):
+        for rec in self:
+            rec.cron_id = rec.integration_id[f"{rec.job}_cron_id"]
+
+    @api.model
+    def _get_job(self, integration, job):
+        """
+        Get the run state of the job of the integration, create it on the first run
+        :param integration: dummy.erp.integration object
+        :param job: job key, e.g. import_product
+        :return: dummy.erp.job object
+        """
+        state = self.sudo().search([("integration_id", "=", integration.id), ("job", "=", job)], limit=1)
+        return state or self.sudo().create({"integration_id": integration.id, "job": job})
@@ -0,0 +1,189 @@
+from odoo import models, fields, api
+from odoo.tools import sql
+
+# Integration exporting a record: the integration the record is bound to, otherwise the active integration exporting
+# the unbound records, preferring the one of the record company
+ROUTE_INTEGRATION_SQL = """
+    COALESCE(rec.dummy_erp_integration_id, (
+        SELECT i.id
+        FROM dummy_erp_integration i
+        WHERE i.active AND i.export_unbound_records
+          AND (i.company_id IS NULL OR rec.company_id IS NULL OR i.company_id = rec.company_id)
+        ORDER BY (i.company_id = rec.company_id) IS TRUE DESC, i.id
+        LIMIT 1
+    ))
+"""
+
+
+class DummyERPOutbox(models.Model):
+    _name = 'dummy.erp.outbox'
+    _description = 'Dummy ERP Outbox'
+    _order = "enqueued_at, id"
+
+    """
+    Queue of the local changes waiting to be exported to the remote Dummy ERP. Each record has at most one entry, the
+    changes made while it is waiting are coalesced into it, and the exporters drain the entries in FIFO batches. Each
+    entry is routed to the integration exporting it, so every integration only drains its own changes.
+    """
+
+    integration_id = fields.Many2one("dummy.erp.integration", "Dummy ERP Integration", ondelete="cascade")
+    res_model = fields.Char("Model", required=1)
+    res_id = fields.Many2oneReference("Record ID", model_field="res_model", required=1)
+    changed_fields = fields.Char("Changed Fields", help="Comma separated names of the changed fields.")
+    enqueued_at = fields.Datetime("Enqueued At", required=1, default=fields.Datetime.now)
+    next_retry_at = fields.Datetime("Next Retry", help="The export of this record failed, it waits until this date.")
+
+    _sql_constraints = [
+        ("res_id_uniq", "unique(res_model, res_id)", "A record can only be queued once."),
+    ]
+
+    def init(self):
+        sql.create_index(
+            self._cr, "dummy_erp_outbox_integration_id_res_model_enqueued_at_index", self._table,
+            ["integration_id", "res_model", "enqueued_at"]
+        )
+
+    @api.model
+    def _enqueue(self, records, changed_fields=None):
+        """
+        Queue the records to be exported, records already queued keep their position and the changed fields are
+        merged into their entry. An entry whose changes are unknown keeps them unknown. Entries are routed to the
+        integration exporting the record.
+        :param records: record set to export
+        :param changed_fields: list of the changed field names, None when the changes are unknown
+        :return: None
+        """
+        if not records:
+            return
+        records.flush_recordset(["dummy_erp_integration_id", "company_id"])
+        self.env["dummy.erp.integration"].flush_model(["active", "export_unbound_records", "company_id"])
+        self.env.cr.execute("""
+            INSERT INTO dummy_erp_outbox (integration_id, res_model, res_id, changed_fields, enqueued_at,
+                                          create_uid, create_date, write_uid, write_date)
+            SELECT {route}, %(model)s, rec.id, %(fields)s, now() at time zone 'UTC',
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            FROM {table} rec
+            WHERE rec.id IN %(ids)s
+            ON CONFLICT (res_model, res_id) DO UPDATE
+            SET changed_fields = CASE
+                    -- Unknown changes (NULL) stay unknown, the record is then exported with its full payload
+                    WHEN dummy_erp_outbox.changed_fields IS NULL OR EXCLUDED.changed_fields IS NULL THEN NULL
+                    ELSE array_to_string(ARRAY(
+                        SELECT DISTINCT unnest(
+                            string_to_array(dummy_erp_outbox.changed_fields, ',')
+                            || string_to_array(EXCLUDED.changed_fields, ',')
+                        ) ORDER BY 1
+                    ), ',')
+                END,
+                integration_id = EXCLUDED.integration_id,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """.format(table=records._table, route=ROUTE_INTEGRATION_SQL), {
+            "model": records._name,
+            "fields": ",".join(sorted(changed_fields or [])) or None,
+            "uid": self.env.uid,
+            "ids": tuple(records.ids),
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _get_pending_records(self, res_model, integration_id, limit=None):
+        """
+        Get the oldest queued records of the model routed to the integration, skipping the ones waiting for a retry.
+        Entries of deleted records are removed.
+        :param res_model: name of the exported model
+        :param integration_id: dummy.erp.integration object
+        :param limit: maximum number of records to return
+        :return: record set of the queued records in FIFO order
+        """
+        entries = self.sudo().search([
+            ("integration_id", "=", integration_id.id),
+            ("res_model", "=", res_model),
+            "|",
+            ("next_retry_at", "=", False),
+            ("next_retry_at", "<=", fields.Datetime.now()),
+        ], limit=limit)
+        records = self.env[res_model].with_context(active_test=False).browse(entries.mapped("res_id"))
+        existing_ids = set(records.exists().ids)
+        if len(existing_ids) < len(records):
+            self._dequeue(res_model, [res_id for res_id in records.ids if res_id not in existing_ids])
+        # exists() does not keep the order
+        return records.filtered(lambda record: record.id in existing_ids)
+
+    @api.model
+    def _get_changed_fields(self, res_model, res_ids):
+        """
+        Get the fields changed since the queued records were last exported
+        :param res_model: name of the exported model
+        :param res_ids: list of record ids
+        :return: dict mapping record ids to the list of their changed field names, empty when they are not known
+        """
+        if not res_ids:
+            return {}
+        entries = self.sudo().search_read(
+            [("res_model", "=", res_model), ("res_id", "in", list(res_ids))], ["res_id", "changed_fields"]
+        )
+        return {
+            entry["res_id"]: entry["changed_fields"].split(",") if entry["changed_fields"] else []
+            for entry in entries
+        }
+
+    @api.model
+    def _count_pending(self, res_model, integration_id):
+        """
+        Count the queued records of the model routed to the integration which are ready to be exported
+        :param res_model: name of the exported model
+        :param integration_id: dummy.erp.integration object
+        :return: integer: number of ready entries
+        """
+        return self.sudo().search_count([
+            ("integration_id", "=", integration_id.id),
+            ("res_model", "=", res_model),
+            "|",
+            ("next_retry_at", "=", False),
+            ("next_retry_at", "<=", fields.Datetime.now()),
+        ])
+
+    @api.model
+    def _route_unbound(self):
+        """
+        Route the entries which have no integration yet, e.g. queued before an integration exported unbound records
+        :return: None
+        """
+        self.flush_model()
+        self.env["dummy.erp.integration"].flush_model(["active", "export_unbound_records", "company_id"])
+        self.env.cr.execute("SELECT DISTINCT res_model FROM dummy_erp_outbox WHERE integration_id IS NULL")
+        for res_model, in self.env.cr.fetchall():
+            if res_model not in self.env:
+                continue
+            self.env[res_model].flush_model(["dummy_erp_integration_id", "company_id"])
+            self.env.cr.execute("""
+                UPDATE dummy_erp_outbox o
+                SET integration_id = {route}
+                FROM {table} rec
+                WHERE o.integration_id IS NULL AND o.res_model = %s AND rec.id = o.res_id
+            """.format(table=self.env[res_model]._table, route=ROUTE_INTEGRATION_SQL), (res_model,))
+        self.invalidate_model(["integration_id"])
+
+    @api.model
+    def _dequeue(self, res_model, res_ids):
+        """
+        Remove the entries of the given records from the queue
+        :param res_model: name of the exported model
+        :param res_ids: list of record ids
+        :return: None
+        """
+        if res_ids:
+            self.sudo().search([("res_model", "=", res_model), ("res_id", "in", list(res_ids))]).unlink()
+
+    @api.model
+    def _postpone(self, res_model, retry_dates):
+        """
+        Postpone the export of the given records
+        :param res_model: name of the exported model
+        :param retry_dates: dict mapping record ids to their next retry date
+        :return: None
+        """
+        entries = self.sudo().search([("res_model", "=", res_model), ("res_id", "in", list(retry_dates))])
+        for entry in entries:
+            entry.next_retry_at = retry_dates[entry.res_id]
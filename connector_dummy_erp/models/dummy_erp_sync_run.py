@@ -0,0 +1,63 @@
+from odoo import models, fields, api
+from odoo.tools import sql
+
+from .dummy_erp_job import JOB_SELECTION
+from .sync_metrics import COUNTERS, PHASES
+
+
+class DummyERPSyncRun(models.Model):
+    _name = 'dummy.erp.sync.run'
+    _description = 'Dummy ERP Sync Run'
+    _order = "started_at desc, id desc"
+
+    """
+    Time spent per phase and counters of a run of an importer, an exporter or the log in carts sync.
+    """
+
+    integration_id = fields.Many2one("dummy.erp.integration", "Dummy ERP Integration", required=1,
+                                     ondelete="cascade")
+    job = fields.Selection(JOB_SELECTION + [
+        ("sync_user_carts", "Sync User Carts"),
+        ("process_webhooks", "Process Webhooks"),
+        ("hydrate_images", "Hydrate Images"),
+    ], string="Job", required=1)
+    started_at = fields.Datetime("Started At", required=1)
+    duration = fields.Float("Duration (s)")
+
+    # Time spent per phase in seconds, nested phases are not counted in their parent
+    http_time = fields.Float("HTTP (s)")
+    parse_time = fields.Float("JSON Parsing (s)")
+    images_time = fields.Float("Image Downloads (s)")
+    prepare_time = fields.Float("Payload Preparation (s)")
+    write_time = fields.Float("ORM Writes (s)")
+
+    records_count = fields.Integer("Records")
+    requests_count = fields.Integer("Requests")
+    bytes_count = fields.Integer("Bytes Received")
+    retries_count = fields.Integer("Retries")
+    errors_count = fields.Integer("Errors")
+
+    def init(self):
+        sql.create_index(
+            self._cr, "dummy_erp_sync_run_integration_id_job_started_at_index", self._table,
+            ["integration_id", "job", "started_at"]
+        )
+
+    @api.model
+    def _get_last_runs(self):
+        """
+        Get the last run of each job of each integration
+        :return: list of dicts with the integration, the job and the values of the run
+        """
+        self.flush_model()
+        columns = ", ".join(
+            ["r.duration"] + [f"r.{phase}_time" for phase in PHASES] + [f"r.{name}_count" for name in COUNTERS]
+        )
+        self.env.cr.execute(f"""
+            SELECT DISTINCT ON (r.integration_id, r.job) r.integration_id, i.name AS integration_name, r.job,
+                   extract(epoch FROM r.started_at) AS started_at, {columns}
+            FROM dummy_erp_sync_run r
+            JOIN dummy_erp_integration i ON i.id = r.integration_id
+            ORDER BY r.integration_id, r.job, r.started_at DESC, r.id DESC
+        """)
+        return self.env.cr.dictfetchall()
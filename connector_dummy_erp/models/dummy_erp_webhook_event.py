@@ -0,0 +1,198 @@
+import json
+import logging
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from odoo.tools import sql
+
+from .api_client import perform_request
+from .dummy_erp_integration import DUMMY_JSON_PATHS
+from .json_tools import decode_json
+from .sync_metrics import collect, count, span
+
+_logger = logging.getLogger(__name__)
+
+# Number of pending events applied by one run of the processing job
+WEBHOOK_BATCH_SIZE = 500
+
+# Model and endpoint used to fetch the remote record of each resource, when the notification carries no data
+WEBHOOK_RESOURCES = {
+    "product": ("product.template", "get_product"),
+    "user": ("res.users", "get_user"),
+    "cart": ("sale.order", "get_cart"),
+}
+
+
+class DummyERPWebhookEvent(models.Model):
+    _name = 'dummy.erp.webhook.event'
+    _description = 'Dummy ERP Webhook Event'
+    _order = "received_at, id"
+
+    """
+    Change notification pushed by the remote Dummy ERP. Notifications are queued by the webhook controller and applied
+    in batches by a background job through the same paths as the imports.
+    """
+
+    integration_id = fields.Many2one("dummy.erp.integration", "Dummy ERP Integration", required=1,
+                                     ondelete="cascade")
+    resource = fields.Selection([
+        ("product", "Product"),
+        ("user", "User"),
+        ("cart", "Cart"),
+    ], string="Resource", required=1)
+    remote_id = fields.Integer("Remote ID", required=1)
+    payload = fields.Text("Payload", help="Remote record sent with the notification, it is fetched when empty.")
+    received_at = fields.Datetime("Received At", required=1, default=fields.Datetime.now)
+    state = fields.Selection([
+        ("pending", "Pending"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ], string="State", default="pending", required=1)
+    error = fields.Text("Error")
+
+    def init(self):
+        sql.create_index(
+            self._cr, "dummy_erp_webhook_event_state_integration_id_index", self._table, ["state", "integration_id"]
+        )
+
+    @api.model
+    def _queue_events(self, integration_id, events):
+        """
+        Validate and queue the notifications received by the webhook, then wake up the processing job
+        :param integration_id: dummy.erp.integration object
+        :param events: list of dicts with the resource, the remote id and optionally the remote record as data
+        :return: integer: number of queued events
+        """
+        vals_list = []
+        for event in events:
+            if event.get("resource") not in WEBHOOK_RESOURCES or not isinstance(event.get("id"), int):
+                raise ValidationError(_("Invalid webhook event: %s") % json.dumps(event)[:200])
+            data = event.get("data")
+            vals_list.append({
+                "integration_id": integration_id.id,
+                "resource": event["resource"],
+                "remote_id": event["id"],
+                "payload": json.dumps(data) if data else False,
+            })
+        self.sudo().create(vals_list)
+        self.env.ref("connector_dummy_erp.ir_cron_dummy_erp_process_webhook_events")._trigger()
+        return len(vals_list)
+
+    @api.model
+    def _cron_process_webhook_events(self):
+        """
+        Apply the pending notifications of each integration, the work is committed after each resource and the job
+        triggers itself again while events remain in the queue.
+        :return: None
+        """
+        events = self.sudo().search([("state", "=", "pending")], limit=WEBHOOK_BATCH_SIZE)
+        for integration in events.integration_id:
+            with collect() as metrics:
+                for resource in WEBHOOK_RESOURCES:
+                    resource_events = events.filtered(
+                        lambda event: event.integration_id == integration and event.resource == resource
+                    )
+                    if resource_events:
+                        resource_events._apply(integration, resource)
+                        integration._commit_progress()
+            integration._store_run("process_webhooks", metrics)
+            integration._commit_progress()
+        if len(events) == WEBHOOK_BATCH_SIZE:
+            self.env.ref("connector_dummy_erp.ir_cron_dummy_erp_process_webhook_events")._trigger()
+
+    def _apply(self, integration_id, resource):
+        """
+        Apply the events of one resource of the integration, only the last notification of each remote record is
+        applied and the records sent without data are fetched from the remote ERP.
+        :param integration_id: dummy.erp.integration object
+        :param resource: resource of the events
+        :return: None
+        """
+        latest_events = {}
+        for event in self:
+            latest_events[event.remote_id] = event
+        payload = []
+        failed = {}
+        for remote_id, event in latest_events.items():
+            try:
+                with span("parse"):
+                    record = decode_json(event.payload) if event.payload else None
+                if record is None:
+                    record = self._fetch_record(integration_id, resource, remote_id)
+                payload.append(dict(record, id=remote_id))
+            except Exception as exc:
+                failed[remote_id] = str(exc)
+        count("records", len(payload))
+        model_name = WEBHOOK_RESOURCES[resource][0]
+        try:
+            with self.env.cr.savepoint():
+                if resource == "cart":
+                    failed.update(self._apply_carts(integration_id, payload))
+                elif payload:
+                    self.env[model_name].create_or_update_from_dummy_erp_payload(integration_id, payload)
+        except Exception as exc:
+            _logger.exception("Cannot apply the %s webhook events of integration %s", resource, integration_id.id)
+            self.write({"state": "failed", "error": str(exc)})
+            count("errors")
+            return
+        failed_events = self.filtered(lambda event: event.remote_id in failed)
+        for event in failed_events:
+            event.write({"state": "failed", "error": failed[event.remote_id]})
+        count("errors", len(failed_events))
+        (self - failed_events).write({"state": "done", "error": False})
+
+    @api.model
+    def _fetch_record(self, integration_id, resource, remote_id):
+        """
+        Fetch the current version of a remote record
+        :param integration_id: dummy.erp.integration object
+        :param resource: resource of the record
+        :param remote_id: id of the record in the remote ERP
+        :return: dict: remote record
+        """
+        path = DUMMY_JSON_PATHS[WEBHOOK_RESOURCES[resource][1]] % remote_id
+        response = perform_request(integration_id, "GET", {}, path)
+        if not 200 <= response.status_code < 300:
+            raise ValidationError(
+                _("Cannot fetch %s %s from dummy ERP: %s") % (resource, remote_id, response.content)
+            )
+        with span("parse"):
+            return decode_json(response.content)
+
+    @api.model
+    def _apply_carts(self, integration_id, carts):
+        """
+        Apply the notified carts: the lines of the carts already imported are replaced, the new carts are imported for
+        their users like the log in sync does. The carts of users which are not imported yet cannot be applied.
+        :param integration_id: dummy.erp.integration object
+        :param carts: list of remote carts
+        :return: dict mapping the remote id of the carts which were not applied to the reason
+        """
+        binding_object = self.env["dummy.erp.binding"]
+        existing_cart_ids = binding_object._get_local_ids(
+            integration_id, "sale.order", [cart["id"] for cart in carts]
+        )
+        user_ids = binding_object._get_local_ids(
+            integration_id, "res.users", list({cart.get("userId") for cart in carts})
+        )
+        failed = {}
+        existing_carts = []
+        carts_by_user = {}
+        for cart in carts:
+            if cart["id"] in existing_cart_ids:
+                existing_carts.append(cart)
+            elif cart.get("userId") in user_ids:
+                carts_by_user.setdefault(user_ids[cart["userId"]], []).append(cart)
+            else:
+                failed[cart["id"]] = _("User %s of the cart is not imported") % cart.get("userId")
+        with span("write"):
+            if existing_carts:
+                failed.update(
+                    self.env["sale.order"].sudo().update_from_dummy_erp_payload(integration_id, existing_carts)
+                )
+            for user_id, user_carts in carts_by_user.items():
+                self.env["sale.order"].sudo().create_from_dummy_erp_payload(
+                    self.env["res.users"].browse(user_id), integration_id, user_carts
+                )
+            self.env.flush_all()
+        return failed
@@ -21,3 +21,10 @@ class IrCron(models.Model):
                     )
                 )
         return super(IrCron, self).unlink()
+
+    # Override manual trigger to run the integration jobs even if they are backing off
+    def method_direct_trigger(self):
+        self.env["dummy.erp.job"].sudo().search([
+            ("integration_id.cron_ids", "in", self.ids), ("skip_until", "!=", False)
+        ]).filtered(lambda state: state.cron_id in self).write({"skip_until": False})
+        return super(IrCron, self).method_direct_trigger()
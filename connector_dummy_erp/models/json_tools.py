@@ -0,0 +1,127 @@
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Decoder of the full responses, orjson is used when it is installed
+_loads = orjson.loads if orjson is not None else json.loads
+
+_raw_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = ",:]}" + _WHITESPACE
+
+
+def set_json_decoder(loads):
+    """Replace the decoder of the full responses
+
+    Args:
+        loads (callable): function decoding JSON bytes or str, like json.loads
+    """
+    global _loads
+    _loads = loads
+
+
+def decode_json(content):
+    """Decode a JSON document once with the configured decoder
+
+    Args:
+        content (bytes): body of the response
+
+    Returns:
+        object: decoded document
+    """
+    return _loads(content)
+
+
+class _StreamReader:
+    """
+    Incremental reader of a JSON text received by chunks, only the part which is not decoded yet is kept in memory.
+    """
+
+    def __init__(self, chunks):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        self.chunks = (decoder.decode(chunk) for chunk in chunks if chunk)
+        self.text = ""
+        self.pos = 0
+        self.done = False
+
+    def fill(self):
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.done = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON stream: expected {char!r} at {self.text[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _raw_decoder.raw_decode(self.text, self.pos)
+                # A number may be truncated by the end of the buffer or decoded from a prefix of its digits (e.g. 4 of
+                # 4.5), a value is only final once followed by a delimiter or at the end of the stream
+                if self.done or (end < len(self.text) and self.text[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.done:
+                    raise
+            self.fill()
+
+
+def iter_json_array(chunks, key, meta=None):
+    """Yield the items of an array of the top level JSON object one by one while the body is received, so large
+    responses are decoded with a memory bounded by the size of one item
+
+    Args:
+        chunks (iterable): bytes chunks of the body, e.g. response.iter_content()
+        key (str): key of the array in the top level object, e.g. products
+        meta (dict): filled with the other keys of the top level object (e.g. total) as they are decoded, keys after
+            the array are only available once all the items were consumed
+
+    Returns:
+        generator: items of the array
+    """
+    meta = {} if meta is None else meta
+    reader = _StreamReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() == "]":
+                        reader.expect("]")
+                        break
+                    reader.expect(",")
+        else:
+            meta[name] = reader.value()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
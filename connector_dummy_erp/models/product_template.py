@@ -1,8 +1,23 @@
-import base64
-import requests
-
 from odoo import models, fields, api
 
+from .api_client import IMAGE_STATE_FIELDS, prepare_image_vals
+from .bulk_tools import group_writes, payload_fingerprint
+from .sync_metrics import span
+
+# Keys of the exported product payload depending on each synced field, an update only sends the keys of the changed
+# fields
+DUMMY_ERP_FIELD_KEYS = {
+    "image_1920": ["thumbnail", "images"],
+    "name": ["title"],
+    "description_sale": ["description"],
+    "list_price": ["price"],
+    "discount_percentage": ["discountPercentage"],
+    "dummy_erp_rating": ["rating"],
+    "dummy_erp_brand": ["brand"],
+    "categ_id": ["category"],
+    "dummy_erp_stock": ["stock"],
+}
+
 
 class ProductTemplate(models.Model):
     _inherit = "product.template"
@@ -13,7 +28,9 @@ class ProductTemplate(models.Model):
 
     # Integration technical fields
     dummy_erp_integration_id = fields.Many2one("dummy.erp.integration", ondelete="restrict")
-    dummy_erp_id = fields.Integer("ID In Dummy ERP")
+    dummy_erp_id = fields.Integer("ID In Dummy ERP", index=True)
+    # Fingerprint of the last imported remote payload, unchanged products are skipped by the next imports
+    dummy_erp_payload_hash = fields.Char("Dummy ERP Payload Fingerprint", copy=False)
 
     # Integration needed fields
     dummy_erp_brand = fields.Char("Dummy ERP Brand")
@@ -21,36 +38,66 @@ class ProductTemplate(models.Model):
     discount_percentage = fields.Float("Discount Percentage")
     dummy_erp_stock = fields.Float("Dummy ERP Stock")
 
+    # Source of the imported image, used to skip downloading and writing unchanged images
+    dummy_erp_image_url = fields.Char("Dummy ERP Image URL", copy=False)
+    dummy_erp_image_etag = fields.Char("Dummy ERP Image ETag", copy=False)
+    dummy_erp_image_last_modified = fields.Char("Dummy ERP Image Last Modified", copy=False)
+    dummy_erp_image_checksum = fields.Char("Dummy ERP Image Checksum", copy=False)
+    dummy_erp_image_pending = fields.Boolean("Dummy ERP Image Pending", copy=False, index=True,
+                                             help="The image is downloaded by the background job.")
+
     # Indicating whether this product should be updated in the dummy ERP. By default, created products should be synced.
     update_to_dummy_erp = fields.Boolean(default=True)
+    # Export failures tracking, a failing product is retried with an exponential backoff
+    dummy_erp_export_failures = fields.Integer("Dummy ERP Export Failures", copy=False)
+    dummy_erp_export_error = fields.Text("Dummy ERP Export Error", copy=False)
+
+    # Override create function to queue the created products to be exported to the dummy ERP
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super(ProductTemplate, self).create(vals_list)
+        if not self.env.context.get('do_not_update_dummy_erp', False):
+            self.env["dummy.erp.outbox"]._enqueue(res.filtered("update_to_dummy_erp"))
+        return res
 
     # Override write function to mark record as update_to_dummy_erp if a relevant field was updated
     def write(self, vals):
-        dummy_erp_fields = ["image_1920", "name", "description_sale", "list_price", "discount_percentage",
-                            "dummy_erp_rating", "dummy_erp_brand", "product_categ_id", "dummy_erp_stock"]
         dummy_erp_updated_fields = [vals_field for
-                                    vals_field in vals if vals_field in dummy_erp_fields]
+                                    vals_field in vals if vals_field in DUMMY_ERP_FIELD_KEYS]
+        update_dummy_erp = len(dummy_erp_updated_fields) > 0 and not self.env.context.get(
+            'do_not_update_dummy_erp', False)
+        if update_dummy_erp:
+            # Mark the records in the same write
+            vals = dict(vals, update_to_dummy_erp=True)
         res = super(ProductTemplate, self).write(vals)
-        if len(dummy_erp_updated_fields) > 0 and not self.env.context.get('do_not_update_dummy_erp', False):
-            self.update_to_dummy_erp = True
+        if update_dummy_erp:
+            self.env["dummy.erp.outbox"]._enqueue(self, dummy_erp_updated_fields)
         return res
 
     @api.model
-    def get_products_to_update(self):
+    def get_products_to_update(self, integration_id, limit=None):
         """
-        Get the products that need to be updated in the remote Dummy ERP
+        Get the products that need to be updated in the remote Dummy ERP from the outbox of the integration, oldest
+        changes first and skipping the failing products until their next retry
+        :param integration_id: dummy.erp.integration object
+        :param limit: maximum number of products to return
         :return: list of dicts containing product payload compatible with remote Dummy ERP
         """
-        products = self.search([("update_to_dummy_erp", "=", True)])
-        return self.prepare_dummy_erp_payload(products)
+        outbox = self.env["dummy.erp.outbox"]
+        products = outbox._get_pending_records(self._name, integration_id, limit)
+        return self.prepare_dummy_erp_payload(products, outbox._get_changed_fields(self._name, products.ids))
 
     @api.model
-    def get_product_id_by_dummy_erp_id(self, dummy_erp_id):
+    def get_product_id_by_dummy_erp_id(self, dummy_erp_id, integration_id=None):
         """
         Get the product.product id from Odoo using the id of Dummy ERP
         :param dummy_erp_id: integer representing record id in the remote Dummy ERP
+        :param integration_id: dummy.erp.integration object, the product is resolved through its bindings if given
         :return: product.product object or False
         """
+        if integration_id:
+            product_ids = self.env["dummy.erp.binding"]._get_local_ids(integration_id, self._name, [dummy_erp_id])
+            return self.browse(product_ids.get(dummy_erp_id)).product_variant_id
         return self.search([("dummy_erp_id", "=", dummy_erp_id)], limit=1).product_variant_id
 
     @api.model
@@ -69,16 +116,41 @@ class ProductTemplate(models.Model):
             return categ_object.create({"name": categ_name}).id
 
     @api.model
-    def prepare_dummy_erp_payload(self, recs):
+    def get_category_ids_by_names(self, categ_names, category_map=None):
         """
-        Prepare the payload for the remote Dummy ERP
+        Resolve the product.category ids of the provided names with a single query, the missing categories are created
+        at once. Names already in category_map are not looked up again so the map can be reused across batches.
+        :param categ_names: iterable of product category names
+        :param category_map: dict mapping category names to ids, updated in place
+        :return: dict mapping category names to product category ids
+        """
+        category_map = {} if category_map is None else category_map
+        missing_names = {categ_name for categ_name in categ_names if categ_name not in category_map}
+        if missing_names:
+            categ_object = self.env["product.category"]
+            # Read in reverse order so the first category by the default order wins, like get_category_by_name
+            for category in reversed(categ_object.search_read([("name", "in", list(missing_names))], ["name"])):
+                category_map[category["name"]] = category["id"]
+            names_to_create = sorted(missing_names - set(category_map))
+            if names_to_create:
+                categories = categ_object.create([{"name": categ_name} for categ_name in names_to_create])
+                category_map.update(zip(names_to_create, categories.ids))
+        return category_map
+
+    @api.model
+    def prepare_dummy_erp_payload(self, recs, changed_fields=None):
+        """
+        Prepare the payload for the remote Dummy ERP. Products already in the remote ERP only send the keys of their
+        changed fields, new products and products without known changes send the full payload.
         :param recs: record set containing products to prepare payload from
+        :param changed_fields: dict mapping product ids to the list of their changed fields
         :return: List of dictionaries containing product payloads
         """
+        changed_fields = changed_fields or {}
         payload = []
         base_url = self.get_base_url()
         for rec in recs:
-            payload.append({
+            product_payload = {
                 "product_obj": rec,
                 "title": rec.name,
                 "description": rec.description_sale or "",
@@ -96,44 +168,104 @@ class ProductTemplate(models.Model):
                     base_url + f'/web/image/product.template/{rec.id}/image_1024',
                     base_url + f'/web/image/product.template/{rec.id}/image_1920'
                 ]
-            })
+            }
+            rec_changed_fields = changed_fields.get(rec.id)
+            if rec.dummy_erp_id and rec_changed_fields and set(rec_changed_fields) <= set(DUMMY_ERP_FIELD_KEYS):
+                keys = {key for field in rec_changed_fields for key in DUMMY_ERP_FIELD_KEYS[field]}
+                product_payload = {key: value for key, value in product_payload.items()
+                                   if key == "product_obj" or key in keys}
+            payload.append(product_payload)
         return payload
 
     @api.model
-    def create_or_update_from_dummy_erp_payload(self, integration_id, payload):
+    def create_or_update_from_dummy_erp_payload(self, integration_id, payload, cache=None):
         """
         Create product if it does not exist and update it if it does exist, this function calls the other function
         prepare_dicts_from_dummy_erp_payload to prepare the odoo-compatible creation dictionaries
         :param integration_id: dummy.erp.integration object
         :param payload: list of dicts imported from the remote Dummy ERP
-        :return: None
+        :param cache: dict shared by the batches of the same import run
+        :return: dict: number of created, updated and skipped (unchanged) products
         """
-        products = self.prepare_dicts_from_dummy_erp_payload(integration_id, payload)
-        for product_dict in products:
-            if product_dict["id"]:
-                product_obj = self.search(
-                    [("dummy_erp_id", "=", product_dict["id"])], limit=1
-                )
-                product_dict.pop('id')
-                if product_obj:
-                    product_obj.with_context(do_not_update_dummy_erp=True).write(product_dict)
-                else:
-                    self.create(product_dict)
+        # Resolve all the remote ids through the integration bindings at once
+        binding_object = self.env["dummy.erp.binding"]
+        existing_products_map = binding_object._read_bound_records(
+            integration_id, self._name, [product["id"] for product in payload if product["id"]],
+            ["dummy_erp_payload_hash"] + IMAGE_STATE_FIELDS
+        )
+        product_ids_map = {dummy_erp_id: product["id"] for dummy_erp_id, product in existing_products_map.items()}
+
+        # Skip the products which did not change since they were last imported, the taxes are part of the fingerprint
+        # since they come from the integration and not from the payload
+        tax_ids = integration_id.default_tax_ids.ids
+        fingerprints = {}
+        changed_payload = []
+        for product in payload:
+            if not product["id"]:
+                continue
+            fingerprint = payload_fingerprint([product, tax_ids])
+            if existing_products_map.get(product["id"], {}).get("dummy_erp_payload_hash") != fingerprint:
+                fingerprints[product["id"]] = fingerprint
+                changed_payload.append(product)
+
+        with span("prepare"):
+            products = self.prepare_dicts_from_dummy_erp_payload(
+                integration_id, changed_payload, existing_products_map, cache
+            )
+        # Keep only the last occurrence of each remote id
+        products_by_dummy_erp_id = {}
+        for product, product_dict in zip(changed_payload, products):
+            dummy_erp_id = product_dict.pop("id")
+            # Keep the fingerprint empty when the image download failed so the next import retries it
+            if not product["images"] or "dummy_erp_image_url" in product_dict:
+                product_dict["dummy_erp_payload_hash"] = fingerprints[dummy_erp_id]
+            products_by_dummy_erp_id[dummy_erp_id] = product_dict
+
+        vals_to_create = []
+        vals_to_write = {}
+        for dummy_erp_id, product_dict in products_by_dummy_erp_id.items():
+            if dummy_erp_id in product_ids_map:
+                vals_to_write[product_ids_map[dummy_erp_id]] = product_dict
+            else:
+                vals_to_create.append(product_dict)
+
+        with span("write"):
+            for vals, product_ids in group_writes(vals_to_write):
+                self.browse(product_ids).with_context(do_not_update_dummy_erp=True).write(vals)
+            if vals_to_create:
+                created_products = self.create(vals_to_create)
+                binding_object._bind(integration_id, self._name, zip(
+                    [dummy_erp_id for dummy_erp_id in products_by_dummy_erp_id if dummy_erp_id not in product_ids_map],
+                    created_products.ids
+                ))
+            self.env.flush_all()
+        return {
+            "created": len(vals_to_create),
+            "updated": len(vals_to_write),
+            "skipped": len(payload) - len(changed_payload),
+        }
 
     @api.model
-    def prepare_dicts_from_dummy_erp_payload(self, integration_id, payload):
+    def prepare_dicts_from_dummy_erp_payload(self, integration_id, payload, image_states=None, cache=None):
         """
         Prepare the odoo-compatible dictionaries for creating or writing products
         :param integration_id: dummy.erp.integration object
         :param payload: list of dictionaries containing products' data imported from Dummy ERP
+        :param image_states: dict mapping the dummy ERP id of existing products to their image state values
+        :param cache: dict shared by the batches of the same import run
         :return:
         """
+        image_states = image_states or {}
+        cache = {} if cache is None else cache
+        category_map = self.get_category_ids_by_names(
+            {product["category"] for product in payload}, cache.setdefault("categories", {})
+        )
         product_dicts = []
+        # Download the changed images of the whole page concurrently, or defer them to the background job
+        image_vals = prepare_image_vals(integration_id, {
+            product["id"]: product["images"][0] if len(product["images"]) > 0 else False for product in payload
+        }, image_states)
         for product in payload:
-            image_1920 = False
-            if len(product["images"]) > 0:
-                # Get image data from URL
-                image_1920 = base64.b64encode(requests.get(product["images"][0]).content)
             product_dicts.append({
                 "id": product["id"],
                 "name": product["title"],
@@ -142,7 +274,7 @@ class ProductTemplate(models.Model):
                 "list_price": product["price"],
                 "description_sale": product["description"],
                 "taxes_id": integration_id.default_tax_ids.ids,
-                "categ_id": self.get_category_by_name(product["category"]),
+                "categ_id": category_map[product["category"]],
                 "dummy_erp_rating": product["rating"],
                 "dummy_erp_brand": product["brand"],
                 "dummy_erp_stock": product["stock"],
@@ -150,8 +282,8 @@ class ProductTemplate(models.Model):
                 # Synced products don't need to be updated in dummy ERP because when they arrive they are same
                 "update_to_dummy_erp": False,
                 "dummy_erp_integration_id": integration_id.id,
-                "image_1920": image_1920,
                 # Enable all products in website for users to create them
-                "website_published": True
+                "website_published": True,
+                **image_vals[product["id"]],
             })
         return product_dicts
@@ -1,10 +1,18 @@
-import requests
-import base64
+import logging
+from datetime import timedelta
 
 from odoo import api, fields, models, SUPERUSER_ID, _
 
-from .api_client import perform_request
+from .api_client import IMAGE_STATE_FIELDS, perform_request, prepare_image_vals
+from .bulk_tools import payload_fingerprint
 from .dummy_erp_integration import DUMMY_JSON_PATHS
+from .json_tools import decode_json
+from .sync_metrics import collect, count, span
+
+_logger = logging.getLogger(__name__)
+
+# Number of users whose carts are synced by one run of the background job
+CART_SYNC_BATCH_SIZE = 50
 
 
 class ResUsers(models.Model):
@@ -12,7 +20,11 @@ class ResUsers(models.Model):
 
     # Integration technical fields
     dummy_erp_integration_id = fields.Many2one("dummy.erp.integration", ondelete="restrict")
-    dummy_erp_id = fields.Integer("ID In Dummy ERP")
+    dummy_erp_id = fields.Integer("ID In Dummy ERP", index=True)
+    # Keyed fingerprint of the last imported remote payload, unchanged users are skipped by the next imports
+    dummy_erp_payload_hash = fields.Char("Dummy ERP Payload Fingerprint", copy=False)
+    # Keyed fingerprint of the last applied remote password, the password is only hashed again when it changes
+    dummy_erp_password_hash = fields.Char("Dummy ERP Password Fingerprint", copy=False)
 
     # Integration needed fields
     first_name = fields.Char("First Name")
@@ -27,48 +39,107 @@ class ResUsers(models.Model):
     eye_color = fields.Char("Eye Color")
     university = fields.Char("University")
 
+    # Source of the imported image, used to skip downloading and writing unchanged images
+    dummy_erp_image_url = fields.Char("Dummy ERP Image URL", copy=False)
+    dummy_erp_image_etag = fields.Char("Dummy ERP Image ETag", copy=False)
+    dummy_erp_image_last_modified = fields.Char("Dummy ERP Image Last Modified", copy=False)
+    dummy_erp_image_checksum = fields.Char("Dummy ERP Image Checksum", copy=False)
+    dummy_erp_image_pending = fields.Boolean("Dummy ERP Image Pending", copy=False, index=True,
+                                             help="The image is downloaded by the background job.")
+
+    # Carts are synced in the background after log in, a pending user is only queued once
+    dummy_erp_cart_sync_pending = fields.Boolean("Dummy ERP Carts Sync Pending", copy=False, index=True)
+    dummy_erp_carts_synced_at = fields.Datetime("Dummy ERP Carts Synced At", copy=False)
+
     @api.model
-    def create_or_update_from_dummy_erp_payload(self, integration_id, payload):
+    def create_or_update_from_dummy_erp_payload(self, integration_id, payload, cache=None):
         """
         Create or update the users from the payload of Dummy ERP, if user exists update record if not then create it.
         :param integration_id: dummy.erp.integration object
         :param payload: list of dicts imported from Dummy ERP containing users values
-        :return: None
+        :param cache: dict shared by the batches of the same import run
+        :return: dict: number of created, updated and skipped (unchanged) users
         """
-        users = self.prepare_dicts_from_dummy_erp_payload(integration_id, payload)
-        for user_dict in users:
-            if user_dict["id"]:
-                user_obj = self.search(
-                    [("dummy_erp_id", "=", user_dict["id"])], limit=1
-                )
+        # Resolve all the remote ids through the integration bindings at once
+        binding_object = self.env["dummy.erp.binding"]
+        image_states = binding_object._read_bound_records(
+            integration_id, self._name, [user["id"] for user in payload if user["id"]],
+            ["dummy_erp_payload_hash", "dummy_erp_password_hash"] + IMAGE_STATE_FIELDS
+        )
+
+        # Skip the users which did not change since they were last imported, the payload holds the password so the
+        # fingerprint is keyed with the database secret
+        secret = self.env["ir.config_parameter"].sudo().get_param("database.secret")
+        fingerprints = {}
+        changed_payload = []
+        for user in payload:
+            if not user["id"]:
+                continue
+            fingerprint = payload_fingerprint(user, key=secret)
+            if image_states.get(user["id"], {}).get("dummy_erp_payload_hash") != fingerprint:
+                fingerprints[user["id"]] = fingerprint
+                changed_payload.append(user)
+
+        with span("prepare"):
+            users = self.prepare_dicts_from_dummy_erp_payload(integration_id, changed_payload, image_states, cache)
+        stats = {"created": 0, "updated": 0, "skipped": len(payload) - len(changed_payload)}
+        with span("write"):
+            create_vals = []
+            for user, user_dict in zip(changed_payload, users):
                 user_dict.pop('id')
+                # Keep the fingerprint empty when the image download failed so the next import retries it
+                if not user.get("image") or "dummy_erp_image_url" in user_dict:
+                    user_dict["dummy_erp_payload_hash"] = fingerprints[user["id"]]
                 password = user_dict.pop("password")
-                if user_obj:
-                    user_obj.write(user_dict)
-                else:
-                    user_obj = self.create(user_dict)
-                user_obj._change_password(password)
+                password_hash = payload_fingerprint(password, key=secret)
+                user_state = image_states.get(user["id"])
+                if not user_state:
+                    # New users are hashed once by the multi-create below
+                    user_dict.update(password=password, dummy_erp_password_hash=password_hash)
+                    create_vals.append(user_dict)
+                    continue
+                # Existing users keep their groups, writing them would clear the access caches of every worker
+                user_dict.pop("groups_id")
+                user_obj = self.browse(user_state["id"])
+                if user_state.get("dummy_erp_password_hash") != password_hash:
+                    user_dict["dummy_erp_password_hash"] = password_hash
+                    user_obj._change_password(password)
+                user_obj.write(user_dict)
+                stats["updated"] += 1
+
+            if create_vals:
+                new_users = self.create(create_vals)
+                binding_object._bind(
+                    integration_id, self._name, list(zip(new_users.mapped("dummy_erp_id"), new_users.ids))
+                )
+                stats["created"] += len(new_users)
+            self.env.flush_all()
+        return stats
 
     @api.model
-    def prepare_dicts_from_dummy_erp_payload(self, integration_id, payload):
+    def prepare_dicts_from_dummy_erp_payload(self, integration_id, payload, image_states=None, cache=None):
         """
         Prepare the creation dictionary from the payload imported from Dummy ERP
         :param integration_id: dummy.erp.integration object
         :param payload: dict with values imported from Dummy ERP
+        :param image_states: dict mapping the dummy ERP id of existing users to their image state values
+        :param cache: dict shared by the batches of the same import run
         :return: dict containing the values to create a user in Odoo
         """
-        group_portal = self.env.ref("base.group_portal")
+        image_states = image_states or {}
+        cache = {} if cache is None else cache
+        if "group_portal_id" not in cache:
+            cache["group_portal_id"] = self.env.ref("base.group_portal").id
         user_dicts = []
+        # Download the changed images of the whole page concurrently, or defer them to the background job
+        image_vals = prepare_image_vals(
+            integration_id, {user["id"]: user.get("image") or False for user in payload}, image_states
+        )
         for user in payload:
-            image_1920 = False
             name = user["firstName"] or "" + user["maidenName"] or "" + user["lastName"] or ""
-            if "image" in user:
-                # Get image data from URL
-                image_1920 = base64.b64encode(requests.get(user["image"]).content)
             user_dicts.append({
                 "id": user["id"],
-                "groups_id": [(4, group_portal.id)],
-                "image_1920": image_1920,
+                "groups_id": [(4, cache["group_portal_id"])],
                 "name": name,
                 "first_name": user["firstName"],
                 "last_name": user["lastName"],
@@ -85,20 +156,69 @@ class ResUsers(models.Model):
                 "eye_color": user["eyeColor"],
                 "university": user["university"],
                 "dummy_erp_integration_id": integration_id.id,
-                "dummy_erp_id": user["id"]
+                "dummy_erp_id": user["id"],
+                **image_vals[user["id"]],
             })
         return user_dicts
 
-    # Override log in function to import carts when user with dummy_erp_id successfully logs in
+    # Override log in function to queue the import of the carts when user with dummy_erp_id successfully logs in, the
+    # carts are imported by a background job so the log in does not wait for the remote ERP
     @classmethod
     def _login(cls, db, login, password, user_agent_env):
         res = super(ResUsers, cls)._login(db, login, password, user_agent_env=user_agent_env)
         if res:
-            with cls.pool.cursor() as cr:
-                self = api.Environment(cr, SUPERUSER_ID, {})[cls._name]
-                self.env["res.users"].search([("id", "=", res)], limit=1).get_dummy_erp_user_carts()
+            try:
+                with cls.pool.cursor() as cr:
+                    self = api.Environment(cr, SUPERUSER_ID, {})[cls._name]
+                    self.browse(res)._request_dummy_erp_carts_sync()
+            except Exception:
+                # Never prevent the user from logging in because of the carts sync
+                _logger.exception("Cannot queue the Dummy ERP carts sync of user %s", res)
         return res
 
+    def _request_dummy_erp_carts_sync(self):
+        """
+        Queue the carts sync of the users and wake up the background job, users already queued or synced within the
+        freshness window of their integration are skipped.
+        :return: None
+        """
+        now = fields.Datetime.now()
+        users = self.filtered(
+            lambda user: user.dummy_erp_integration_id and user.dummy_erp_id
+            and not user.dummy_erp_cart_sync_pending
+            and not (
+                user.dummy_erp_carts_synced_at
+                and user.dummy_erp_carts_synced_at > now - timedelta(
+                    minutes=user.dummy_erp_integration_id.cart_sync_freshness_minutes
+                )
+            )
+        )
+        if users:
+            users.write({"dummy_erp_cart_sync_pending": True})
+            self.env.ref("connector_dummy_erp.ir_cron_dummy_erp_sync_user_carts")._trigger()
+
+    @api.model
+    def _cron_sync_dummy_erp_user_carts(self):
+        """
+        Import the carts of the users queued at log in, the work is committed after each user and the job triggers
+        itself again while users remain in the queue.
+        :return: None
+        """
+        users = self.search([("dummy_erp_cart_sync_pending", "=", True)], limit=CART_SYNC_BATCH_SIZE)
+        users.filtered(lambda u: not u.dummy_erp_integration_id).write({"dummy_erp_cart_sync_pending": False})
+        for integration in users.dummy_erp_integration_id:
+            with collect() as metrics:
+                for user in users.filtered(lambda u: u.dummy_erp_integration_id == integration):
+                    user.get_dummy_erp_user_carts()
+                    user.write({
+                        "dummy_erp_cart_sync_pending": False, "dummy_erp_carts_synced_at": fields.Datetime.now()
+                    })
+                    integration._commit_progress()
+            integration._store_run("sync_user_carts", metrics)
+            integration._commit_progress()
+        if len(users) == CART_SYNC_BATCH_SIZE:
+            self.env.ref("connector_dummy_erp.ir_cron_dummy_erp_sync_user_carts")._trigger()
+
     def get_dummy_erp_user_carts(self):
         """
         Get user carts if he has any pending carts in the dummy ERP
@@ -109,21 +229,22 @@ class ResUsers(models.Model):
             try:
                 response = perform_request(integration, "GET", {},
                                            DUMMY_JSON_PATHS["get_user_carts"] % self.dummy_erp_id)
-                if (
-                        200 <= response.status_code < 300
-                        and "carts" in response.json()
-                ):
-                    payload = response.json()["carts"]
+                with span("parse"):
+                    data = decode_json(response.content) if 200 <= response.status_code < 300 else {}
+                if "carts" in data:
+                    payload = data["carts"]
+                    count("records", len(payload))
                     if len(payload) > 0:
-                        self.env["sale.order"].sudo().create_from_dummy_erp_payload(
-                            self, integration, payload
-                        )
+                        with span("write"):
+                            self.env["sale.order"].sudo().create_from_dummy_erp_payload(
+                                self, integration, payload
+                            )
+                            self.env.flush_all()
                     integration.log_operation(
                         _("Get User Carts"),
-                        (
-                            f"User {self.name} carts imported successfully {response.json()['carts']}"
-                        ),
+                        f"User {self.name} carts imported successfully",
                         "info",
+                        payload=payload,
                     )
                 else:
                     integration.log_operation(
@@ -1,4 +1,5 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, _
+from odoo.fields import Command
 
 
 class SaleOrder(models.Model):
@@ -16,47 +17,104 @@ class SaleOrder(models.Model):
 
     # Integration fields
     dummy_erp_integration_id = fields.Many2one("dummy.erp.integration", ondelete="restrict")
-    dummy_erp_id = fields.Integer("ID In Dummy ERP")
+    dummy_erp_id = fields.Integer("ID In Dummy ERP", index=True)
 
     # Indicating whether this order should be updated in the dummy ERP. By default, created orders should be synced.
     update_to_dummy_erp = fields.Boolean(default=True)
+    # Export failures tracking, a failing order is retried with an exponential backoff
+    dummy_erp_export_failures = fields.Integer("Dummy ERP Export Failures", copy=False)
+    dummy_erp_export_error = fields.Text("Dummy ERP Export Error", copy=False)
+
+    # Override create function to queue the created orders to be exported to the dummy ERP
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super(SaleOrder, self).create(vals_list)
+        if not self.env.context.get('do_not_update_dummy_erp', False):
+            self.env["dummy.erp.outbox"]._enqueue(res.filtered("update_to_dummy_erp"))
+        return res
+
+    # Override write function to queue the orders explicitly marked to be updated in the dummy ERP
+    def write(self, vals):
+        res = super(SaleOrder, self).write(vals)
+        if vals.get("update_to_dummy_erp") and not self.env.context.get('do_not_update_dummy_erp', False):
+            self.env["dummy.erp.outbox"]._enqueue(self, ["order_line"])
+        return res
 
     @api.model
-    def get_carts_to_update(self):
+    def get_carts_to_update(self, integration_id, limit=None):
         """
-        Get orders that need to be updated in the remote Dummy ERP
+        Get orders that need to be updated in the remote Dummy ERP from the outbox of the integration, oldest changes
+        first and skipping the failing orders until their next retry. Orders which cannot be exported (without a user
+        of the Dummy ERP) leave the outbox.
+        :param integration_id: dummy.erp.integration object
+        :param limit: maximum number of orders to return
         :return: List of dictionaries that are sent as a payload for the remote Dummy ERP
         """
-        products = self.search([("update_to_dummy_erp", "=", True)])
-        return self.prepare_dummy_erp_payload(products)
+        orders = self.env["dummy.erp.outbox"]._get_pending_records(self._name, integration_id, limit)
+        payload = self.prepare_dummy_erp_payload(orders)
+        exported_ids = {cart["cart_obj"].id for cart in payload}
+        self.env["dummy.erp.outbox"]._dequeue(
+            self._name, [order_id for order_id in orders.ids if order_id not in exported_ids]
+        )
+        return payload
 
     @api.model
     def prepare_dummy_erp_payload(self, recs):
         """
-        Prepare the payload for exporting carts to the remote Dummy ERP
+        Prepare the payload for exporting carts to the remote Dummy ERP, orders and lines are read for all the records
+        at once and orders whose partner has no user of the Dummy ERP are skipped.
         :param recs: record set containing orders that need to be updated
         :return: list of dicts containing payload for carts in the Dummy ERP
         """
+        if not recs:
+            return []
+        self.env["sale.order"].flush_model(["dummy_erp_id", "partner_id"])
+        self.env["sale.order.line"].flush_model(
+            ["order_id", "product_id", "price_unit", "product_uom_qty", "discount", "sequence"]
+        )
+        self.env["res.users"].flush_model(["partner_id", "dummy_erp_id", "active", "login"])
+        self.env["product.product"].flush_model(["product_tmpl_id"])
+        self.env["product.template"].flush_model(["dummy_erp_id"])
+
+        # User of the cart: the first active user of the partner known by the Dummy ERP, local users have no cart there
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (so.id) so.id, so.dummy_erp_id, u.dummy_erp_id
+            FROM sale_order so
+            JOIN res_users u ON u.partner_id = so.partner_id AND u.active
+                AND u.dummy_erp_id IS NOT NULL AND u.dummy_erp_id != 0
+            WHERE so.id IN %s
+            ORDER BY so.id, u.login
+        """, (tuple(recs.ids),))
+        orders = {order_id: (dummy_erp_id, user_dummy_erp_id)
+                  for order_id, dummy_erp_id, user_dummy_erp_id in self.env.cr.fetchall()}
+
+        self.env.cr.execute("""
+            SELECT sol.order_id, pt.dummy_erp_id, sol.price_unit, sol.product_uom_qty, sol.discount
+            FROM sale_order_line sol
+            JOIN product_product pp ON pp.id = sol.product_id
+            JOIN product_template pt ON pt.id = pp.product_tmpl_id
+            WHERE sol.order_id IN %s AND pt.dummy_erp_id IS NOT NULL AND pt.dummy_erp_id != 0
+            ORDER BY sol.order_id, sol.sequence, sol.id
+        """, (tuple(orders) or (0,),))
+        lines = {}
+        for order_id, product_dummy_erp_id, price_unit, quantity, discount in self.env.cr.fetchall():
+            lines.setdefault(order_id, []).append({
+                "id": product_dummy_erp_id,
+                "price": price_unit,
+                "quantity": quantity,
+                "discountPercentage": discount or 0.0,
+            })
+
         payload = []
         for rec in recs:
-            lines = []
-            # Get user of the cart
-            user_id = rec.partner_id.user_ids[0]
-            for sol in rec.order_line:
-                if sol.product_id.dummy_erp_id:
-                    lines.append(
-                        {
-                            "id": sol.product_id.dummy_erp_id,
-                            "price": sol.price_unit,
-                            "quantity": sol.product_uom_qty,
-                            "discountPercentage": sol.discount,
-                        }
-                    )
+            if rec.id not in orders:
+                continue
+            dummy_erp_id, user_dummy_erp_id = orders[rec.id]
             payload.append({
-                "id": rec.dummy_erp_id,
-                "userId": user_id.dummy_erp_id,
+                "id": dummy_erp_id or False,
+                "userId": user_dummy_erp_id or False,
                 "cart_obj": rec,
-                "products": lines
+                "products": lines.get(rec.id, []),
             })
         return payload
 
@@ -69,39 +127,98 @@ class SaleOrder(models.Model):
         :param carts: list of dicts containing payloads imported from Dummy ERP
         :return: None
         """
+        binding_object = self.env["dummy.erp.binding"]
+        # Resolve the existing carts and all the products of the payload with one query each
+        existing_cart_ids = binding_object._get_local_ids(integration_id, self._name, [cart["id"] for cart in carts])
+        new_carts = {cart["id"]: cart for cart in carts if cart["id"] not in existing_cart_ids}
+        if not new_carts:
+            return
+        product_ids = self._get_dummy_erp_product_ids(integration_id, new_carts.values())
+
+        website_id = self._dummy_erp_default_website()
+        orders_vals = []
+        for cart in new_carts.values():
+            lines = self._prepare_dummy_erp_lines(cart, product_ids)
+            orders_vals.append({
+                "partner_id": user_id.partner_id.id,
+                "partner_invoice_id": user_id.partner_id.id,
+                "dummy_erp_id": cart["id"],
+                "website_id": website_id.id,
+                "update_to_dummy_erp": False,
+                "dummy_erp_integration_id": integration_id.id,
+                "order_line": lines,
+            })
+        # Imported carts are the same as in the dummy ERP, creating their lines must not mark them to be updated
+        orders = self.env["sale.order"].with_context(do_not_update_dummy_erp=True).create(orders_vals)
+        binding_object._bind(integration_id, self._name, zip(new_carts, orders.ids))
+
+    @api.model
+    def update_from_dummy_erp_payload(self, integration_id, carts):
+        """
+        Replace the lines of the carts already imported with the lines of their remote payload, confirmed orders are
+        not changed anymore
+        :param integration_id: dummy.erp.integration object
+        :param carts: list of dicts containing payloads imported from Dummy ERP
+        :return: dict mapping the remote id of the carts which were not updated to the reason
+        """
+        existing_cart_ids = self.env["dummy.erp.binding"]._get_local_ids(
+            integration_id, self._name, [cart["id"] for cart in carts]
+        )
+        orders = self.browse(existing_cart_ids.values())
+        failed = {}
+        carts_to_update = []
         for cart in carts:
-            if not self.search([("dummy_erp_id", "=", cart["id"])], limit=1):
-                lines = []
-                for item in cart["products"]:
-                    product_id = self.env["product.template"].get_product_id_by_dummy_erp_id(
-                        item["id"]
-                    )
-                    if product_id:
-                        line_price = item["price"]
-                        line_discount = item["discountPercentage"]
-                        line_quantity = item["quantity"]
-                        lines.append(
-                            [
-                                0,
-                                0,
-                                {
-                                    "product_id": product_id.id,
-                                    "product_uom_qty": line_quantity,
-                                    "price_unit": line_price,
-                                    "discount": line_discount,
-                                },
-                            ]
-                        )
-                    else:
-                        continue
-
-                website_id = self._dummy_erp_default_website()
-                self.env["sale.order"].create({
-                    "partner_id": user_id.partner_id.id,
-                    "partner_invoice_id": user_id.partner_id.id,
-                    "dummy_erp_id": cart["id"],
-                    "website_id": website_id.id,
-                    "update_to_dummy_erp": False,
-                    "dummy_erp_integration_id": integration_id.id,
-                    "order_line": lines,
-                })
+            order = orders.browse(existing_cart_ids.get(cart["id"]))
+            if not order:
+                failed[cart["id"]] = _("The cart is not imported")
+            elif order.state not in ("draft", "sent"):
+                failed[cart["id"]] = _("The order %s is confirmed, it is not updated anymore") % order.name
+            else:
+                carts_to_update.append((order, cart))
+        product_ids = self._get_dummy_erp_product_ids(integration_id, [cart for _order, cart in carts_to_update])
+        for order, cart in carts_to_update:
+            # Imported carts are the same as in the dummy ERP, replacing their lines must not mark them to be updated
+            order.with_context(do_not_update_dummy_erp=True).write({
+                "order_line": [Command.clear()] + self._prepare_dummy_erp_lines(cart, product_ids),
+            })
+        return failed
+
+    @api.model
+    def _get_dummy_erp_product_ids(self, integration_id, carts):
+        """
+        Resolve the products of the given remote carts with one query
+        :param integration_id: dummy.erp.integration object
+        :param carts: list of dicts containing payloads imported from Dummy ERP
+        :return: dict mapping remote product ids to product.product ids
+        """
+        product_tmpl_ids = self.env["dummy.erp.binding"]._get_local_ids(integration_id, "product.template", list({
+            item["id"] for cart in carts for item in cart["products"]
+        }))
+        # Same variant as product_variant_id: the first one of each template in the default order
+        variant_ids = {}
+        for variant in self.env["product.product"].search_read(
+                [("product_tmpl_id", "in", list(product_tmpl_ids.values()))], ["product_tmpl_id"]
+        ):
+            variant_ids.setdefault(variant["product_tmpl_id"][0], variant["id"])
+        return {
+            dummy_erp_id: variant_ids[product_tmpl_id]
+            for dummy_erp_id, product_tmpl_id in product_tmpl_ids.items() if product_tmpl_id in variant_ids
+        }
+
+    @api.model
+    def _prepare_dummy_erp_lines(self, cart, product_ids):
+        """
+        Prepare the order lines commands of a remote cart, the products which are not imported are skipped
+        :param cart: dict containing the payload of the cart imported from Dummy ERP
+        :param product_ids: dict mapping remote product ids to product.product ids
+        :return: list of order line create commands
+        """
+        return [
+            Command.create({
+                "product_id": product_ids[item["id"]],
+                "product_uom_qty": item["quantity"],
+                "price_unit": item["price"],
+                "discount": item["discountPercentage"],
+            })
+            for item in cart["products"] if item["id"] in product_ids
+        ]
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# Phases timed by the sync runs and counters they collect, both are stored on dummy.erp.sync.run
+PHASES = ("http", "parse", "images", "prepare", "write")
+COUNTERS = ("records", "requests", "bytes", "retries", "errors")
+
+# Collector of the run in progress in the current thread
+_current = threading.local()
+
+
+class SyncMetrics:
+    """
+    Time spent per phase and counters of a sync run. Counters can be increased from the HTTP worker threads of the
+    run, spans are only measured by the thread running the sync. A nested span is not counted in its parent, so the
+    phases add up to the wall time of the run.
+    """
+
+    def __init__(self):
+        # Start (UTC) and duration in seconds of the run, set by collect
+        self.started_at = None
+        self.duration = 0.0
+        self.spans = defaultdict(float)
+        self.counters = defaultdict(int)
+        # Open spans of the sync thread as [phase, time spent in nested spans]
+        self.open_spans = []
+        self._lock = threading.Lock()
+
+    def add_span(self, phase, seconds):
+        with self._lock:
+            self.spans[phase] += seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+
+def current_metrics():
+    """Return the collector of the run in progress in this thread
+
+    Returns:
+        object: SyncMetrics or None outside a run
+    """
+    return getattr(_current, "metrics", None)
+
+
+@contextmanager
+def collect(metrics=None):
+    """Make the given collector the current one of this thread for the duration of the block, the duration of the
+    block is added to the run duration
+
+    Args:
+        metrics (object): SyncMetrics to use, a new one is created if not given
+
+    Returns:
+        object: context manager yielding the SyncMetrics
+    """
+    metrics = metrics or SyncMetrics()
+    previous = current_metrics()
+    _current.metrics = metrics
+    metrics.started_at = metrics.started_at or datetime.utcnow().replace(microsecond=0)
+    started_at = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.duration += time.perf_counter() - started_at
+        _current.metrics = previous
+
+
+def bind_metrics(function):
+    """Wrap a function run by a worker thread so it reports to the collector of the calling thread, the function can
+    count but must not open spans (see span)
+
+    Args:
+        function (callable): function to run in another thread
+
+    Returns:
+        callable: wrapped function
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        return function
+
+    def wrapper(*args, **kwargs):
+        previous = current_metrics()
+        _current.metrics = metrics
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current.metrics = previous
+    return wrapper
+
+
+@contextmanager
+def span(phase):
+    """Add the duration of the block to the phase of the current run, no-op outside a run. It must only be used by
+    the thread running the sync, never inside a function wrapped by bind_metrics: the worker threads share the open
+    spans of the calling thread, which are not protected by the lock.
+
+    Args:
+        phase (str): one of PHASES
+
+    Returns:
+        object: context manager
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    metrics.open_spans.append([phase, 0.0])
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started_at
+        nested = metrics.open_spans.pop()[1]
+        metrics.add_span(phase, elapsed - nested)
+        if metrics.open_spans:
+            metrics.open_spans[-1][1] += elapsed
+
+
+def count(name, value=1):
+    """Increase a counter of the current run, no-op outside a run
+
+    Args:
+        name (str): one of COUNTERS
+        value (int): increment
+    """
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.count(name, value)
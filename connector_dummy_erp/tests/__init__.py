@@ -1,3 +1,10 @@
 from . import test_product
 from . import test_sale_order
 from . import test_ir_cron
+from . import test_res_users
+from . import test_api_client
+from . import test_binding
+from . import test_sync_metrics
+from . import test_webhook
+from . import test_integration_log
+from . import test_benchmark
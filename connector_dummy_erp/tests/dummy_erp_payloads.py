@@ -0,0 +1,53 @@
+# Builders of the remote Dummy ERP records used by the tests, extra keyword arguments override the generated values
+
+
+def get_product_payload(dummy_erp_id, price=10.0, **values):
+    return {
+        'id': dummy_erp_id,
+        'title': f'Remote Product {dummy_erp_id}',
+        'description': 'Remote product description',
+        'price': price,
+        'discountPercentage': 0.0,
+        'rating': 4.5,
+        'stock': 10,
+        'brand': 'Remote Brand',
+        'category': 'Remote Category',
+        'images': [],
+        **values,
+    }
+
+
+def get_user_payload(dummy_erp_id, password='remote-password', **values):
+    return {
+        'id': dummy_erp_id,
+        'firstName': 'Remote',
+        'lastName': f'User {dummy_erp_id}',
+        'maidenName': '',
+        'age': 30,
+        'gender': 'female',
+        'email': f'remote_user_{dummy_erp_id}@example.com',
+        'username': f'remote_user_{dummy_erp_id}',
+        'password': password,
+        'birthDate': '1990-01-01',
+        'image': False,
+        'bloodGroup': 'A+',
+        'height': 170,
+        'weight': 70.5,
+        'eyeColor': 'Brown',
+        'university': 'Remote University',
+        **values,
+    }
+
+
+def get_cart_payload(dummy_erp_id, user_id, products):
+    """
+    :param products: list of (remote product id, price, quantity) tuples
+    """
+    return {
+        'id': dummy_erp_id,
+        'userId': user_id,
+        'products': [
+            {'id': product_id, 'price': price, 'quantity': quantity, 'discountPercentage': 0.0}
+            for product_id, price, quantity in products
+        ],
+    }
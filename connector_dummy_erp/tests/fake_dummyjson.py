@@ -0,0 +1,209 @@
+import json
+import random
+import threading
+import time
+from base64 import b64decode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Smallest valid PNG, served for every product and user image
+IMAGE_CONTENT = b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+IMAGE_ETAG = '"dummy-erp-fake-image"'
+CATEGORIES = ["smartphones", "laptops", "fragrances", "skincare", "groceries", "home-decoration"]
+
+
+class FakeDummyJSON:
+    """
+    Local stand-in for the dummyjson endpoints of DUMMY_JSON_PATHS. Records are generated from their id when they are
+    requested, so large catalogues do not need to be held in memory. Each request waits for the configured latency
+    and fails with a 503 at the configured error rate.
+    """
+
+    def __init__(self, products=1000, users=100, carts_per_user=2, latency=0.0, error_rate=0.0, seed=0):
+        self.products = products
+        self.users = users
+        self.carts_per_user = carts_per_user
+        self.latency = latency
+        self.error_rate = error_rate
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_ids = {"products": products, "carts": users * carts_per_user}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serve the endpoints from a background thread on a free local port
+        :return: str: base URL of the server
+        """
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDummyJSONHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-dummyjson", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def _should_fail(self):
+        with self._lock:
+            self.request_count += 1
+            failed = self._random.random() < self.error_rate
+            self.error_count += failed
+        return failed
+
+    def _new_id(self, resource):
+        with self._lock:
+            self._next_ids[resource] += 1
+            return self._next_ids[resource]
+
+    def get_product(self, product_id):
+        return {
+            "id": product_id,
+            "title": f"Product {product_id}",
+            "description": f"Description of the product {product_id}",
+            "price": 10 + product_id % 990,
+            "discountPercentage": product_id % 20,
+            "rating": round(3 + (product_id % 20) / 10, 2),
+            "stock": product_id % 150,
+            "brand": f"Brand {product_id % 50}",
+            "category": CATEGORIES[product_id % len(CATEGORIES)],
+            "thumbnail": f"{self.base_url}/images/products/{product_id}/thumbnail.png",
+            "images": [f"{self.base_url}/images/products/{product_id}/1.png"],
+        }
+
+    def get_user(self, user_id):
+        return {
+            "id": user_id,
+            "firstName": f"First{user_id}",
+            "lastName": f"Last{user_id}",
+            "maidenName": "",
+            "age": 18 + user_id % 60,
+            "gender": "female" if user_id % 2 else "male",
+            "email": f"user{user_id}@dummy-erp.example.com",
+            "username": f"dummy_erp_user_{user_id}",
+            "password": f"password-{user_id}",
+            "birthDate": "1990-01-01",
+            "image": f"{self.base_url}/images/users/{user_id}.png",
+            "bloodGroup": "A+",
+            "height": 170,
+            "weight": 70.5,
+            "eyeColor": "Brown",
+            "university": "Dummy University",
+        }
+
+    def get_cart(self, cart_id, user_id):
+        products = []
+        for index in range(3):
+            product_id = (cart_id * 7 + index * 13) % self.products + 1
+            products.append({
+                "id": product_id,
+                "title": f"Product {product_id}",
+                "price": 10 + product_id % 990,
+                "quantity": 1 + index,
+                "discountPercentage": product_id % 20,
+            })
+        return {"id": cart_id, "userId": user_id, "products": products}
+
+    def get_page(self, resource, total, getter, query):
+        limit = int(query.get("limit", ["30"])[0])
+        skip = int(query.get("skip", ["0"])[0])
+        stop = total if limit <= 0 else min(total, skip + limit)
+        return {
+            resource: [getter(record_id) for record_id in range(skip + 1, stop + 1)],
+            "total": total,
+            "skip": skip,
+            "limit": stop - skip,
+        }
+
+
+class FakeDummyJSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, values):
+        body = json.dumps(values).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _handle(self, method):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        payload = self._read_json() if method in ("POST", "PUT") else {}
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake._should_fail():
+            return self._send_json(503, {"message": "Service Unavailable"})
+
+        if method == "GET" and parts[0] == "images":
+            if self.headers.get("If-None-Match") == IMAGE_ETAG:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("ETag", IMAGE_ETAG)
+            self.send_header("Content-Length", str(len(IMAGE_CONTENT)))
+            self.end_headers()
+            self.wfile.write(IMAGE_CONTENT)
+            return
+        if method == "GET" and parts == ["test"]:
+            return self._send_json(200, {"status": "ok"})
+        if method == "GET" and parts == ["products"]:
+            return self._send_json(200, fake.get_page("products", fake.products, fake.get_product, parse_qs(url.query)))
+        if method == "GET" and parts == ["users"]:
+            return self._send_json(200, fake.get_page("users", fake.users, fake.get_user, parse_qs(url.query)))
+        if method == "GET" and len(parts) == 2 and parts[1].isdigit():
+            record_id = int(parts[1])
+            if parts[0] == "products" and record_id <= fake.products:
+                return self._send_json(200, fake.get_product(record_id))
+            if parts[0] == "users" and record_id <= fake.users:
+                return self._send_json(200, fake.get_user(record_id))
+            if parts[0] == "carts" and record_id <= fake.users * fake.carts_per_user:
+                return self._send_json(200, fake.get_cart(record_id, (record_id - 1) // fake.carts_per_user + 1))
+        if method == "GET" and len(parts) == 3 and parts[0] == "users" and parts[2] == "carts":
+            user_id = int(parts[1])
+            first_cart_id = (user_id - 1) * fake.carts_per_user + 1
+            carts = [fake.get_cart(cart_id, user_id) for cart_id in range(
+                first_cart_id, first_cart_id + fake.carts_per_user
+            )]
+            return self._send_json(200, {"carts": carts, "total": len(carts), "skip": 0, "limit": len(carts)})
+        if method == "POST" and len(parts) == 2 and parts[0] in ("products", "carts") and parts[1] == "add":
+            return self._send_json(201, dict(payload, id=fake._new_id(parts[0])))
+        if method == "PUT" and len(parts) == 2 and parts[0] in ("products", "carts"):
+            return self._send_json(200, dict(payload, id=int(parts[1])))
+        return self._send_json(404, {"message": f"Route {method} {url.path} not found"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
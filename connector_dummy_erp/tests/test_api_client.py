@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from odoo.tests import tagged, TransactionCase
+
+from ..models import api_client
+
+
+@tagged('post_install', '-at_install')
+class TestApiClient(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+        })
+
+    def setUp(self):
+        super().setUp()
+        self.http_config = self.integration._get_http_config()
+        api_client._sessions.pop(self.http_config['key'], None)
+        self.addCleanup(api_client._sessions.pop, self.http_config['key'], None)
+
+    def test_session_is_reused(self):
+        ''' Ensure the pooled session is reused until the pool or retry settings of the integration change '''
+        session = api_client.get_session(self.http_config)
+        self.assertIs(api_client.get_session(self.http_config), session)
+        self.integration.http_max_retries = 5
+        self.assertIsNot(api_client.get_session(self.integration._get_http_config()), session,
+                         "Changing the retry settings should rebuild the session")
+
+    def test_post_is_not_retried(self):
+        ''' Ensure only idempotent requests are retried, a retried POST could create duplicates '''
+        with patch.object(api_client, 'HTTPAdapter', wraps=api_client.HTTPAdapter) as adapter:
+            api_client.get_session(self.http_config)
+        retry = adapter.call_args.kwargs['max_retries']
+        self.assertEqual(retry.total, self.integration.http_max_retries)
+        self.assertTrue(retry.is_retry('GET', 503))
+        self.assertTrue(retry.is_retry('PUT', 503))
+        self.assertFalse(retry.is_retry('POST', 503), "POST requests should never be retried")
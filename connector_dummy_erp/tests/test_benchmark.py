@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from odoo.tests import tagged, TransactionCase
+
+from .fake_dummyjson import FakeDummyJSON
+
+_logger = logging.getLogger(__name__)
+
+
+def _env_number(name, default, type=int):
+    return type(os.environ.get(name, default))
+
+
+@tagged('dummy_erp_benchmark', '-standard', 'post_install', '-at_install')
+class TestBenchmark(TransactionCase):
+    '''
+    Throughput benchmark of the import, export and log in carts flows against a local fake dummyjson server. It is
+    not part of the standard tests, run it with --test-tags dummy_erp_benchmark. The catalogue and the server
+    behaviour are configured with the environment variables:
+        DUMMY_ERP_BENCH_PRODUCTS, DUMMY_ERP_BENCH_USERS, DUMMY_ERP_BENCH_CARTS_PER_USER: catalogue size
+        DUMMY_ERP_BENCH_LATENCY_MS: latency of each request
+        DUMMY_ERP_BENCH_ERROR_RATE: share of the requests failing with a 503, between 0 and 1
+        DUMMY_ERP_BENCH_STREAMING: 1 to decode the imported pages while they are received
+        DUMMY_ERP_BENCH_OUTPUT: path of the JSON report, each flow is logged as a JSON line otherwise
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = {
+            "products": _env_number("DUMMY_ERP_BENCH_PRODUCTS", 2000),
+            "users": _env_number("DUMMY_ERP_BENCH_USERS", 200),
+            "carts_per_user": _env_number("DUMMY_ERP_BENCH_CARTS_PER_USER", 2),
+            "latency_ms": _env_number("DUMMY_ERP_BENCH_LATENCY_MS", 0, float),
+            "error_rate": _env_number("DUMMY_ERP_BENCH_ERROR_RATE", 0, float),
+            "streaming": bool(_env_number("DUMMY_ERP_BENCH_STREAMING", 0)),
+        }
+        cls.fake = FakeDummyJSON(
+            products=cls.config["products"],
+            users=cls.config["users"],
+            carts_per_user=cls.config["carts_per_user"],
+            latency=cls.config["latency_ms"] / 1000,
+            error_rate=cls.config["error_rate"],
+        )
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Benchmark Integration',
+            'base_url': cls.fake.start(),
+            'active': True,
+            'export_unbound_records': True,
+            'export_batch_size': 0,
+            'import_streaming': cls.config["streaming"],
+        })
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+        report = {"config": cls.config, "results": cls.results}
+        output = os.environ.get("DUMMY_ERP_BENCH_OUTPUT")
+        if output:
+            with open(output, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+        super().tearDownClass()
+
+    def _measure(self, flow, method, *args):
+        ''' Run the flow and record its throughput, number of queries and HTTP requests and peak memory '''
+        self.env.flush_all()
+        queries = self.env.cr.sql_log_count
+        requests = self.fake.request_count
+        errors = self.fake.error_count
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        records = method(*args)
+        self.env.flush_all()
+        duration = time.perf_counter() - started_at
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # Imports return their stats, every record read from the remote counts in the throughput
+        stats = records if isinstance(records, dict) else None
+        if stats is not None:
+            records = sum(stats.values())
+        result = {
+            "flow": flow,
+            "records": records,
+            "stats": stats,
+            "seconds": round(duration, 3),
+            "records_per_second": round(records / duration, 1) if duration else None,
+            "queries": self.env.cr.sql_log_count - queries,
+            "http_requests": self.fake.request_count - requests,
+            "http_errors": self.fake.error_count - errors,
+            "peak_memory_kb": peak_memory // 1024,
+        }
+        self.results.append(result)
+        _logger.info("dummy_erp_benchmark %s", json.dumps(result))
+        return result
+
+    def _import(self, path_key, payload_key, cursor_field, model_name):
+        return self.integration._import_paginated(path_key, payload_key, cursor_field, model_name)
+
+    def _sync_login_carts(self, users):
+        users._request_dummy_erp_carts_sync()
+        users_object = self.env['res.users']
+        while users_object.search_count([('dummy_erp_cart_sync_pending', '=', True)]):
+            users_object._cron_sync_dummy_erp_user_carts()
+        return len(users)
+
+    def _export(self, method_name):
+        return getattr(self.integration, method_name)()[0]
+
+    def test_benchmark_flows(self):
+        products_args = ("get_products", "products", "import_product_cursor", "product.template")
+        self._measure("import_products", self._import, *products_args)
+        unchanged = self._measure("import_products_unchanged", self._import, *products_args)
+        if not self.config["error_rate"]:
+            # Injected errors can exhaust the retries of a page, and products whose image failed are updated again
+            self.assertEqual(unchanged["stats"], {"created": 0, "updated": 0, "skipped": self.config["products"]})
+        self._measure("import_users", self._import, "get_users", "users", "import_user_cursor", "res.users")
+
+        users = self.env['res.users'].search([('dummy_erp_integration_id', '=', self.integration.id)])
+        self._measure("login_carts", self._sync_login_carts, users)
+
+        products = self.env['product.template'].search([('dummy_erp_integration_id', '=', self.integration.id)])
+        products.write({'dummy_erp_stock': 1})
+        self._measure("export_products", self._export, "_export_dummy_products")
+
+        orders = self.env['sale.order'].search([('dummy_erp_integration_id', '=', self.integration.id)])
+        orders.write({'update_to_dummy_erp': True})
+        self._measure("export_carts", self._export, "_export_dummy_carts")
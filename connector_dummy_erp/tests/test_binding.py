@@ -0,0 +1,66 @@
+from psycopg2 import IntegrityError
+
+from odoo.tests import tagged, TransactionCase
+from odoo.tools import mute_logger
+
+
+@tagged('post_install', '-at_install')
+class TestBinding(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+        })
+        cls.partners = cls.env['res.partner'].create([
+            {'name': 'Bound Partner 1'},
+            {'name': 'Bound Partner 2'},
+            {'name': 'Bound Partner 3'},
+        ])
+        cls.binding = cls.env['dummy.erp.binding']
+
+    def test_remote_ids_are_resolved(self):
+        ''' Ensure the bound remote ids resolve to their local records and unknown ones are left out '''
+        self.binding._bind(self.integration, 'res.partner', [(101, self.partners[0].id), (102, self.partners[1].id)])
+        self.assertEqual(
+            self.binding._get_local_ids(self.integration, 'res.partner', [101, 102, 103]),
+            {101: self.partners[0].id, 102: self.partners[1].id},
+        )
+
+    def test_rebinding_replaces_the_outdated_bindings(self):
+        ''' Ensure binding a remote id or a record again replaces its previous binding '''
+        self.binding._bind(self.integration, 'res.partner', [(101, self.partners[0].id), (102, self.partners[1].id)])
+        self.binding._bind(self.integration, 'res.partner', [(101, self.partners[2].id), (103, self.partners[1].id)])
+        self.assertEqual(
+            self.binding._get_local_ids(self.integration, 'res.partner', [101, 102, 103]),
+            {101: self.partners[2].id, 103: self.partners[1].id},
+        )
+        bindings = self.binding.search([('integration_id', '=', self.integration.id)])
+        self.assertEqual(len(bindings), 2, "Outdated bindings should have been removed")
+
+    def test_bindings_of_deleted_records_are_ignored(self):
+        ''' Ensure a binding left by a deleted record does not resolve '''
+        partner = self.env['res.partner'].create({'name': 'Deleted Partner'})
+        self.binding._bind(self.integration, 'res.partner', [(104, partner.id)])
+        partner.unlink()
+        self.assertEqual(self.binding._get_local_ids(self.integration, 'res.partner', [104]), {})
+
+    @mute_logger('odoo.sql_db')
+    def test_remote_id_is_bound_once_per_integration(self):
+        ''' Ensure the same remote id cannot be bound twice for the same integration and model '''
+        self.binding._bind(self.integration, 'res.partner', [(101, self.partners[0].id)])
+        with self.assertRaises(IntegrityError), self.cr.savepoint():
+            self.binding.create({
+                'integration_id': self.integration.id,
+                'res_model': 'res.partner',
+                'res_id': self.partners[1].id,
+                'dummy_erp_id': 101,
+            })
+            self.binding.flush_model()
+        other_integration = self.env['dummy.erp.integration'].create({'name': 'Other Integration'})
+        self.binding._bind(other_integration, 'res.partner', [(101, self.partners[1].id)])
+        self.assertEqual(
+            self.binding._get_local_ids(other_integration, 'res.partner', [101]), {101: self.partners[1].id},
+            "Another integration can bind the same remote id",
+        )
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from freezegun import freeze_time
+
+from odoo.tests import tagged, TransactionCase
+
+from ..models.dummy_erp_integration import LOG_DETAILS_MAX_LENGTH
+
+
+@tagged('post_install', '-at_install')
+class TestIntegrationLog(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+            'log_retention_days': 30,
+            'log_store_payloads': True,
+        })
+        cls.log = cls.env['dummy.erp.integration.log']
+
+    def _create_log(self, name, type, create_date, record_count=0, payload=None):
+        self.integration.log_operation(name, 'Details', type, payload=payload, record_count=record_count)
+        log = self.log.search([('integration_id', '=', self.integration.id)], order='id desc', limit=1)
+        self.env.cr.execute(
+            "UPDATE dummy_erp_integration_log SET create_date = %s WHERE id = %s", (create_date, log.id)
+        )
+        log.invalidate_recordset(['create_date'])
+        return log
+
+    @freeze_time('2026-06-15 12:00:00')
+    def test_old_info_entries_are_compacted(self):
+        ''' Ensure old info entries are aggregated per day and subject while warnings, errors and recent entries
+        are kept '''
+        old_day = datetime(2026, 5, 1)
+        old_logs = self._create_log('Import Products', 'info', old_day + timedelta(hours=2), 10, payload=[{'id': 1}])
+        old_logs |= self._create_log('Import Products', 'info', old_day + timedelta(hours=8), 5)
+        old_logs |= self._create_log('Import Users', 'info', old_day + timedelta(hours=9), 3)
+        old_logs |= self._create_log('Import Products', 'info', old_day + timedelta(days=1, hours=1), 7)
+        attachment = old_logs[0].payload_attachment_id
+        self.assertTrue(attachment, "The payload should be stored when enabled on the integration")
+        kept = self._create_log('Import Products', 'warning', old_day, 1)
+        kept |= self._create_log('Import Products', 'error', old_day, 1)
+        kept |= self._create_log('Import Products', 'info', datetime(2026, 6, 10), 2)
+
+        self.log._cron_compact_logs()
+
+        self.assertFalse(old_logs.exists(), "The aggregated entries should be deleted")
+        self.assertFalse(attachment.exists(), "The payloads of the aggregated entries should be deleted")
+        self.assertEqual(len(kept.exists()), 3)
+        rollups = self.log.search([('integration_id', '=', self.integration.id), ('is_rollup', '=', True)])
+        self.assertEqual(
+            sorted((log.name, log.create_date, log.record_count) for log in rollups),
+            [
+                ('Import Products', old_day, 15),
+                ('Import Products', old_day + timedelta(days=1), 7),
+                ('Import Users', old_day, 3),
+            ],
+        )
+        self.assertEqual(set(rollups.mapped('type')), {'info'})
+
+        # The rollups are old info entries themselves, they are not aggregated again
+        self.log._cron_compact_logs()
+        self.assertEqual(len(rollups.exists()), 3)
+
+    def test_details_are_truncated(self):
+        ''' Ensure the details of a log entry are capped whatever the size of the operation '''
+        self.integration.log_operation('Export Products', 'x' * (LOG_DETAILS_MAX_LENGTH * 2), 'error')
+        log = self.log.search([('integration_id', '=', self.integration.id)], order='id desc', limit=1)
+        self.assertTrue(log.details.startswith('x' * LOG_DETAILS_MAX_LENGTH))
+        self.assertLess(len(log.details), LOG_DETAILS_MAX_LENGTH + 100)
+        self.assertIn(f'truncated, {LOG_DETAILS_MAX_LENGTH * 2} characters', log.details)
+
+        payload = [{'id': index, 'title': 'y' * 1000} for index in range(50)]
+        self.integration.log_operation('Import Products', 'Imported', 'info', payload=payload)
+        log = self.log.search([('integration_id', '=', self.integration.id)], order='id desc', limit=1)
+        self.assertLess(len(log.details), LOG_DETAILS_MAX_LENGTH + 100)
+        self.assertIn('Sample (3 of 50)', log.details)
+        self.assertEqual(log.record_count, 50)
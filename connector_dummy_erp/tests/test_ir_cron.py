@@ -1,3 +1,5 @@
+import zlib
+
 from odoo.tests import tagged, TransactionCase
 from odoo.exceptions import UserError
 
@@ -24,3 +26,43 @@ class TestIRCron(TransactionCase):
 
         with self.assertRaises(UserError), self.cr.savepoint():
             self.cron.unlink()
+
+    def test_idle_job_backs_off(self):
+        ''' Ensure a job which found nothing to do skips its next runs until it processes records again '''
+        state = self.env['dummy.erp.job']._get_job(self.integratin, 'export_product')
+        self.integratin._schedule_job(state, 0, 0, 0.1)
+        self.assertEqual(state.idle_runs, 1)
+        self.assertTrue(state.skip_until, "An idle job should back off")
+        self.integratin._schedule_job(state, 5, 0, 0.1)
+        self.assertEqual(state.idle_runs, 0)
+        self.assertFalse(state.skip_until, "A job which processed records should run at its normal interval")
+
+    def test_import_jobs_reconcile_with_webhooks(self):
+        ''' Ensure the import jobs of an integration receiving webhooks run at the reconciliation interval without
+        backing off '''
+        integration = self.env['dummy.erp.integration'].create({
+            'name': 'Webhook Integration Test Name',
+            'webhook_enabled': True,
+        })
+        self.assertEqual(integration.import_product_cron_id.interval_type, 'hours',
+                         "An integration created with webhooks should not poll every few minutes")
+        self.assertEqual(integration.import_product_cron_id.interval_number, integration.webhook_reconciliation_hours)
+        state = self.env['dummy.erp.job']._get_job(integration, 'import_product')
+        integration._schedule_job(state, 0, 0, 0.1)
+        self.assertFalse(state.skip_until, "The reconciliation should not be delayed by the idle backoff")
+
+    def test_overlapping_run_is_skipped(self):
+        ''' Ensure a job does not run while another run of the same job holds its lock '''
+        lock_key = zlib.crc32(b"dummy_erp_export_product") & 0x7FFFFFFF
+        with self.registry.cursor() as other_cr:
+            other_cr.execute("SELECT pg_advisory_lock(%s, %s)", (lock_key, self.integratin.id))
+            self.env['dummy.erp.integration'].export_dummy_products(self.integratin.id)
+            other_cr.execute("SELECT pg_advisory_unlock(%s, %s)", (lock_key, self.integratin.id))
+        self.assertFalse(self.integratin.job_ids, "The overlapping run should have been skipped")
+
+    def test_job_run_metrics_are_stored(self):
+        ''' Ensure each job run stores its phase timings and counters '''
+        self.env['dummy.erp.integration'].export_dummy_products(self.integratin.id)
+        run = self.env['dummy.erp.sync.run'].search([('integration_id', '=', self.integratin.id)])
+        self.assertEqual(run.job, 'export_product')
+        self.assertEqual(run.requests_count, 0, "Nothing was queued so no request should have been sent")
@@ -1,5 +1,19 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from freezegun import freeze_time
+
 from odoo.tests import tagged, TransactionCase
 
+from ..models import dummy_erp_integration
+from ..models.json_tools import iter_json_array
+from .dummy_erp_payloads import get_product_payload
+from .fake_dummyjson import IMAGE_CONTENT
+
 
 @tagged('post_install', '-at_install')
 class TestProduct(TransactionCase):
@@ -14,6 +28,9 @@ class TestProduct(TransactionCase):
             'default_code': cls.product_code,
             'dummy_erp_id': False
         })
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+        })
 
     def test_product_needs_to_be_updated(self):
         update_to_dummy_erp = self.product.update_to_dummy_erp
@@ -21,4 +38,241 @@ class TestProduct(TransactionCase):
                          "When product created it should be by default update to dummy ERP if it does "
                          "not have dummy ERP ID")
 
+    def test_bulk_upsert_from_dummy_erp_payload(self):
+        ''' Ensure importing the same remote products twice updates them instead of creating duplicates '''
+        product_template = self.env['product.template']
+        product_template.create_or_update_from_dummy_erp_payload(self.integration, [
+            get_product_payload(9001, 10.0),
+            get_product_payload(9002, 10.0),
+        ])
+        product_template.create_or_update_from_dummy_erp_payload(self.integration, [
+            get_product_payload(9001, 15.0),
+            get_product_payload(9002, 15.0),
+            get_product_payload(9003, 20.0),
+        ])
+        products = product_template.search([('dummy_erp_id', 'in', [9001, 9002, 9003])])
+        self.assertEqual(len(products), 3, "Each remote product should be imported exactly once")
+        self.assertEqual(products.mapped('list_price'), [15.0, 15.0, 20.0])
+        self.assertFalse(any(products.mapped('update_to_dummy_erp')),
+                         "Imported products should not be marked to be updated in dummy ERP")
+
+    def test_unchanged_dummy_erp_payload_is_skipped(self):
+        ''' Ensure products are not written again when their remote payload did not change '''
+        product_template = self.env['product.template']
+        payload = [get_product_payload(9101, 10.0)]
+        stats = product_template.create_or_update_from_dummy_erp_payload(self.integration, payload)
+        self.assertEqual(stats, {'created': 1, 'updated': 0, 'skipped': 0})
+        stats = product_template.create_or_update_from_dummy_erp_payload(self.integration, payload)
+        self.assertEqual(stats, {'created': 0, 'updated': 0, 'skipped': 1})
+
+    def test_interrupted_import_resumes_from_cursor(self):
+        ''' Ensure an import interrupted by a failing page resumes from the last imported page '''
+        self.integration.import_page_size = 2
+        total = 5
+        requested_skips = []
+        fail_at_skip = 2
+
+        def perform_request(integration, method, payload, path, stream=False):
+            query = parse_qs(urlparse(path).query)
+            limit, skip = int(query['limit'][0]), int(query['skip'][0])
+            requested_skips.append(skip)
+            if fail_at_skip == skip:
+                raise requests.ConnectionError("Remote ERP unreachable")
+            products = [get_product_payload(9800 + index) for index in range(skip, min(skip + limit, total))]
+            return Mock(status_code=200, content=json.dumps({'products': products, 'total': total}).encode())
+
+        args = ('get_products', 'products', 'import_product_cursor', 'product.template')
+        with patch.object(dummy_erp_integration, 'perform_request', side_effect=perform_request):
+            with self.assertRaises(requests.ConnectionError):
+                self.integration._import_paginated(*args)
+            self.assertEqual(self.integration.import_product_cursor, 2, "The first page should have been kept")
+            fail_at_skip = None
+            requested_skips.clear()
+            stats = self.integration._import_paginated(*args)
+        self.assertEqual(requested_skips, [2, 4], "The second run should start from the stored cursor")
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(self.integration.import_product_cursor, 0, "The cursor should be reset after the last page")
+        self.assertEqual(
+            self.env['product.template'].search_count([('dummy_erp_id', '>=', 9800), ('dummy_erp_id', '<', 9805)]), 5
+        )
+
+    def test_export_failures_are_isolated(self):
+        ''' Ensure a failing product is postponed with a doubling delay while the others of the batch are exported '''
+        self.integration.write({'active': True, 'export_unbound_records': True})
+        exported, server_error, unreachable = self.env['product.template'].create([
+            {'name': 'Exported Product'}, {'name': 'Server Error Product'}, {'name': 'Unreachable Product'},
+        ])
+        outbox = self.env['dummy.erp.outbox']
+
+        def export(responses):
+            export_requests = [(product, 'POST', '/products/add', {}) for product in responses]
+            with patch.object(dummy_erp_integration, 'perform_requests', return_value={
+                product.id: response for product, response in responses.items()
+            }):
+                return self.integration._export_to_dummy_erp('product.template', export_requests)
+
+        def outbox_entry(product):
+            return outbox.search([('res_model', '=', 'product.template'), ('res_id', '=', product.id)])
+
+        def retry_at(product):
+            return outbox_entry(product).next_retry_at
+
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        with freeze_time(now):
+            failures = export({
+                exported: Mock(status_code=201, content=b'{"id": 9901}'),
+                server_error: Mock(status_code=500, content=b'{"message": "Internal Server Error"}'),
+                unreachable: requests.ConnectionError("Remote ERP unreachable"),
+            })
+            self.assertEqual([failure[0] for failure in failures], [server_error, unreachable])
+            self.assertEqual(exported.dummy_erp_id, 9901)
+            self.assertEqual(exported.dummy_erp_integration_id, self.integration)
+            self.assertFalse(exported.update_to_dummy_erp)
+            self.assertFalse(outbox_entry(exported), "The exported product should leave the outbox")
+            self.assertEqual((server_error | unreachable).mapped('dummy_erp_export_failures'), [1, 1])
+            self.assertIn('Internal Server Error', server_error.dummy_erp_export_error)
+            self.assertEqual(retry_at(server_error), now + timedelta(minutes=2))
+            pending = outbox._get_pending_records('product.template', self.integration)
+            self.assertFalse((server_error | unreachable) & pending, "Postponed products should wait for their retry")
+
+            export({server_error: Mock(status_code=500, content=b'{"message": "Internal Server Error"}')})
+            self.assertEqual(server_error.dummy_erp_export_failures, 2)
+            self.assertEqual(retry_at(server_error), now + timedelta(minutes=4), "The delay should double")
+            unreachable.with_context(do_not_update_dummy_erp=True).dummy_erp_export_failures = 20
+            export({unreachable: requests.ConnectionError("Remote ERP unreachable")})
+            self.assertEqual(retry_at(unreachable), now + timedelta(days=1), "The delay should be capped to one day")
+
+            export({server_error: Mock(status_code=201, content=b'{"id": 9902}')})
+            self.assertEqual(server_error.dummy_erp_export_failures, 0, "A successful export should reset the failures")
+            self.assertFalse(server_error.dummy_erp_export_error)
+
+    def test_streamed_page_is_decoded(self):
+        ''' Ensure a streamed page gives the same products whatever the size of the received chunks '''
+        page = {
+            'products': [get_product_payload(dummy_erp_id, 10.5) for dummy_erp_id in range(1, 20)],
+            'total': 194,
+            'skip': 0,
+        }
+        body = json.dumps(page).encode()
+        for chunk_size in (1, 7, 4096):
+            meta = {}
+            chunks = [body[index:index + chunk_size] for index in range(0, len(body), chunk_size)]
+            self.assertEqual(list(iter_json_array(chunks, 'products', meta)), page['products'])
+            self.assertEqual(meta, {'total': 194, 'skip': 0})
+        # A chunk ending inside a number holds a valid prefix of it, the number is only decoded with its next chunk
+        meta = {}
+        self.assertEqual(list(iter_json_array([b'{"products":[4.5', b'],"total":9}'], 'products', meta)), [4.5])
+        self.assertEqual(meta, {'total': 9})
+
+    def test_product_changes_are_coalesced_in_outbox(self):
+        ''' Ensure several changes of the same product are queued as a single outbox entry '''
+        product_template = self.product.product_tmpl_id
+        # Drop the entry queued by the creation, its changes are unknown
+        self.env['dummy.erp.outbox']._dequeue('product.template', product_template.ids)
+        product_template.write({'list_price': 20.0})
+        product_template.write({'name': 'Product Test New Name'})
+        entries = self.env['dummy.erp.outbox'].search([
+            ('res_model', '=', 'product.template'), ('res_id', '=', product_template.id)
+        ])
+        self.assertEqual(len(entries), 1, "Changes of the same product should be coalesced")
+        self.assertEqual(entries.changed_fields, 'list_price,name')
+
+    def test_deferred_images_are_left_pending(self):
+        ''' Ensure products imported with deferred images only store the image URL for the background job '''
+        self.integration.defer_image_download = True
+        payload = get_product_payload(9301, 10.0)
+        payload['images'] = ['https://dummy-erp.example.com/images/9301.png']
+        self.env['product.template'].create_or_update_from_dummy_erp_payload(self.integration, [payload])
+        product = self.env['product.template'].search([('dummy_erp_id', '=', 9301)])
+        self.assertTrue(product.dummy_erp_image_pending)
+        self.assertEqual(product.dummy_erp_image_url, payload['images'][0])
+        self.assertFalse(product.image_1920, "The image should not be downloaded during the import")
+
+    def test_unknown_changes_are_kept_in_outbox(self):
+        ''' Ensure an entry whose changes are unknown still sends the full payload after a known change '''
+        product_template = self.product.product_tmpl_id
+        product_template.with_context(do_not_update_dummy_erp=True).write({'dummy_erp_id': 9202})
+        outbox = self.env['dummy.erp.outbox']
+        outbox._dequeue('product.template', product_template.ids)
+        outbox._enqueue(product_template)
+        product_template.write({'list_price': 20.0})
+        entry = outbox.search([('res_model', '=', 'product.template'), ('res_id', '=', product_template.id)])
+        self.assertFalse(entry.changed_fields, "Unknown changes should not be narrowed by a later change")
+        payload = self.env['product.template'].prepare_dummy_erp_payload(
+            product_template, outbox._get_changed_fields('product.template', product_template.ids)
+        )
+        self.assertIn('title', payload[0], "A product with unknown changes should send the full payload")
+
+    def test_pending_images_are_hydrated(self):
+        ''' Ensure the background job stores the downloaded images and requeues the failed ones with the next import '''
+        self.integration.defer_image_download = True
+        payload = []
+        for dummy_erp_id in (9311, 9312):
+            product_payload = get_product_payload(dummy_erp_id, 10.0)
+            product_payload['images'] = [f'https://dummy-erp.example.com/images/{dummy_erp_id}.png']
+            payload.append(product_payload)
+        self.env['product.template'].create_or_update_from_dummy_erp_payload(self.integration, payload)
+        downloaded = self.env['product.template'].get_product_id_by_dummy_erp_id(9311, self.integration).product_tmpl_id
+        failed = self.env['product.template'].get_product_id_by_dummy_erp_id(9312, self.integration).product_tmpl_id
+        self.assertTrue(failed.dummy_erp_payload_hash)
+
+        results = {
+            downloaded.id: {
+                'changed': True,
+                'image': base64.b64encode(IMAGE_CONTENT),
+                'etag': '"image-etag"',
+                'last_modified': False,
+                'checksum': 'image-checksum',
+            },
+            failed.id: False,
+        }
+        with patch.object(dummy_erp_integration, 'fetch_images', return_value=results) as fetch_images:
+            self.assertFalse(self.integration._hydrate_images(0), "A limit of 0 should pause the downloads")
+            fetch_images.assert_not_called()
+            backlog = self.integration._hydrate_images(10)
+        self.assertFalse(backlog)
+        self.assertEqual(set(fetch_images.call_args.args[1]), {downloaded.id, failed.id})
+        self.assertFalse(downloaded.dummy_erp_image_pending)
+        self.assertTrue(downloaded.image_1920)
+        self.assertEqual(downloaded.dummy_erp_image_etag, '"image-etag"')
+        self.assertFalse(failed.dummy_erp_image_pending)
+        self.assertFalse(failed.dummy_erp_payload_hash, "A failed download should be queued again by the next import")
+        self.assertFalse(downloaded.update_to_dummy_erp, "Hydrated images should not be exported back")
+
+    def test_update_only_sends_changed_fields(self):
+        ''' Ensure a product already in dummy ERP only sends its changed fields while a new one sends everything '''
+        product_template = self.product.product_tmpl_id
+        new_product = self.env['product.template'].create({'name': 'New Product Test Name'})
+        product_template.with_context(do_not_update_dummy_erp=True).write({'dummy_erp_id': 9201})
+        # The product was exported, only its next changes are pending
+        self.env['dummy.erp.outbox']._dequeue('product.template', product_template.ids)
+        (product_template | new_product).write({
+            'list_price': 25.0,
+            'categ_id': self.env.ref('product.product_category_all').id,
+        })
+        payload = self.env['product.template'].prepare_dummy_erp_payload(
+            product_template | new_product,
+            self.env['dummy.erp.outbox']._get_changed_fields('product.template', [product_template.id, new_product.id])
+        )
+        self.assertEqual(set(payload[0]), {'product_obj', 'price', 'category'})
+        self.assertEqual(payload[0]['price'], 25.0)
+        self.assertIn('title', payload[1], "A product not exported yet should send the full payload")
+
+    def test_outbox_is_scoped_per_integration(self):
+        ''' Ensure an integration only exports the changes of its own products and the routed unbound ones '''
+        other_integration = self.env['dummy.erp.integration'].create({
+            'name': 'Other Integration Test Name',
+        })
+        self.integration.write({'active': True, 'export_unbound_records': True})
+        bound_product = self.env['product.template'].create({
+            'name': 'Bound Product',
+            'dummy_erp_integration_id': other_integration.id,
+        })
+        product_template = self.env['product.template']
+        exported = [payload['product_obj'] for payload in product_template.get_products_to_update(self.integration)]
+        self.assertNotIn(bound_product, exported, "A product bound to another integration should not be exported")
+        self.assertIn(self.product.product_tmpl_id, exported, "Unbound products should be routed to the integration")
+        other_exported = product_template.get_products_to_update(other_integration)
+        self.assertEqual([payload['product_obj'] for payload in other_exported], [bound_product])
+
     # TODO: Finish testing product
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from odoo.tests import tagged, TransactionCase
+
+from ..models import res_users
+from .dummy_erp_payloads import get_user_payload
+
+
+@tagged('post_install', '-at_install')
+class TestResUsers(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+        })
+        cls.users = cls.env['res.users'].create([{
+            'name': f'Dummy ERP User {index}',
+            'login': f'dummy_erp_user_{index}',
+            'dummy_erp_integration_id': cls.integration.id,
+            'dummy_erp_id': 9400 + index,
+        } for index in range(3)])
+
+    def test_unchanged_password_is_not_hashed_again(self):
+        ''' Ensure an updated user only gets its password hashed again when the remote password changed '''
+        users = self.env['res.users']
+        stats = users.create_or_update_from_dummy_erp_payload(
+            self.integration, [get_user_payload(9501, 'first-password')]
+        )
+        self.assertEqual(stats['created'], 1)
+        user = users.search([('dummy_erp_id', '=', 9501)])
+        self.assertTrue(user.dummy_erp_password_hash)
+        with patch.object(type(users), '_change_password', autospec=True) as change_password:
+            stats = users.create_or_update_from_dummy_erp_payload(
+                self.integration, [get_user_payload(9501, 'first-password', age=31)]
+            )
+            self.assertEqual(stats['updated'], 1)
+            self.assertEqual(user.age, 31)
+            change_password.assert_not_called()
+            users.create_or_update_from_dummy_erp_payload(
+                self.integration, [get_user_payload(9501, 'second-password', age=31)]
+            )
+            change_password.assert_called_once_with(user, 'second-password')
+
+    def test_carts_sync_runs_by_batches(self):
+        ''' Ensure the carts sync job handles the queued users by batches and triggers itself while users remain '''
+        unbound_user = self.env['res.users'].create({'name': 'Unbound User', 'login': 'dummy_erp_unbound_user'})
+        (self.users | unbound_user).write({'dummy_erp_cart_sync_pending': True})
+        cron_class = type(self.env['ir.cron'])
+        with patch.object(res_users, 'CART_SYNC_BATCH_SIZE', 3), \
+                patch.object(res_users.ResUsers, 'get_dummy_erp_user_carts', autospec=True) as get_carts, \
+                patch.object(cron_class, '_trigger', autospec=True) as trigger:
+            self.env['res.users']._cron_sync_dummy_erp_user_carts()
+            self.assertEqual(trigger.call_count, 1, "A full batch should trigger the next one")
+            self.assertEqual(len(self.env['res.users'].search([('dummy_erp_cart_sync_pending', '=', True)])), 1)
+            self.env['res.users']._cron_sync_dummy_erp_user_carts()
+        self.assertEqual(trigger.call_count, 1, "The last partial batch should not trigger another run")
+        self.assertFalse(self.env['res.users'].search([('dummy_erp_cart_sync_pending', '=', True)]))
+        self.assertEqual({call.args[0] for call in get_carts.call_args_list}, set(self.users),
+                         "Only the users of an integration should have their carts fetched")
+        self.assertTrue(all(self.users.mapped('dummy_erp_carts_synced_at')))
+        runs = self.env['dummy.erp.sync.run'].search([
+            ('integration_id', '=', self.integration.id), ('job', '=', 'sync_user_carts')
+        ])
+        self.assertTrue(runs, "Each run should store its metrics")
@@ -32,4 +32,41 @@ class TestSaleOrder(TransactionCase):
         self.assertEqual(update_to_dummy_erp, True,
                          "When order created it should be by default update to dummy ERP if it does "
                          "not have dummy ERP ID")
+
+    def test_order_without_user_is_not_exported(self):
+        ''' Ensure orders whose partner has no user are skipped when preparing the carts payload '''
+        payload = self.env['sale.order'].prepare_dummy_erp_payload(self.order)
+        self.assertEqual(payload, [], "Orders without a linked user cannot be exported as carts")
+
+    def test_order_of_local_user_is_dequeued(self):
+        ''' Ensure orders of users unknown by the Dummy ERP leave the outbox without being exported '''
+        integration = self.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+            'active': True,
+            'export_unbound_records': True,
+        })
+        portal_user = self.env['res.users'].create({
+            'name': 'Local Portal User',
+            'login': 'dummy_erp_local_portal_user',
+            'groups_id': [Command.set([self.env.ref('base.group_portal').id])],
+        })
+        remote_user = self.env['res.users'].create({
+            'name': 'Remote User',
+            'login': 'dummy_erp_remote_user',
+            'dummy_erp_integration_id': integration.id,
+            'dummy_erp_id': 9801,
+        })
+        local_order, remote_order = self.env['sale.order'].create([{
+            'partner_id': user.partner_id.id,
+            'order_line': [Command.create({'product_id': self.product.id})],
+        } for user in (portal_user, remote_user)])
+        outbox = self.env['dummy.erp.outbox']
+        self.assertEqual(outbox._get_pending_records('sale.order', integration) & local_order, local_order)
+
+        carts = {cart['cart_obj']: cart for cart in self.env['sale.order'].get_carts_to_update(integration)}
+        self.assertNotIn(local_order, carts, "Local users have no cart in the Dummy ERP")
+        self.assertEqual(carts[remote_order]['userId'], 9801)
+        self.assertFalse(outbox.search([('res_model', '=', 'sale.order'), ('res_id', '=', local_order.id)]),
+                         "The order of the local user should leave the outbox")
+
     # TODO: Finish testing sale order
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from odoo.tests import tagged, HttpCase, TransactionCase
+
+from ..models import sync_metrics
+
+
+@tagged('post_install', '-at_install')
+class TestSyncMetrics(TransactionCase):
+
+    def test_nested_span_is_not_counted_in_its_parent(self):
+        ''' Ensure the time of a nested span is only added to its own phase so the phases add up to the run '''
+        # Start of the run, outer start, inner start, inner end, outer end, end of the run
+        with patch.object(sync_metrics, 'time') as time:
+            time.perf_counter.side_effect = [0.0, 1.0, 2.0, 5.0, 6.0, 10.0]
+            with sync_metrics.collect() as metrics:
+                with sync_metrics.span('write'):
+                    with sync_metrics.span('http'):
+                        pass
+        self.assertEqual(dict(metrics.spans), {'write': 2.0, 'http': 3.0})
+        self.assertEqual(metrics.duration, 10.0)
+        self.assertEqual(metrics.open_spans, [])
+
+    def test_worker_threads_count_for_the_run(self):
+        ''' Ensure the counters increased by bound worker threads are added to the run of the calling thread '''
+        with sync_metrics.collect() as metrics:
+            count_request = sync_metrics.bind_metrics(lambda _index: sync_metrics.count('requests'))
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(count_request, range(20)))
+        # Unbound threads and code outside a run do not report to any run
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _index: sync_metrics.count('requests'), range(5)))
+        sync_metrics.count('requests')
+        self.assertEqual(metrics.counters['requests'], 20)
+        self.assertIsNone(sync_metrics.current_metrics())
+
+
+@tagged('post_install', '-at_install')
+class TestMetricsRoute(HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+        })
+        cls.env['dummy.erp.sync.run'].create({
+            'integration_id': cls.integration.id,
+            'job': 'export_product',
+            'started_at': '2024-01-01 00:00:00',
+            'duration': 1.5,
+            'http_time': 1.25,
+            'requests_count': 3,
+        })
+
+    def test_route_requires_the_token(self):
+        ''' Ensure the route is disabled without a configured token and refuses a wrong one '''
+        self.assertEqual(self.url_open('/dummy_erp/metrics').status_code, 404)
+        self.env['ir.config_parameter'].sudo().set_param('connector_dummy_erp.metrics_token', 'metrics-secret')
+        self.assertEqual(self.url_open('/dummy_erp/metrics?token=wrong').status_code, 403)
+        self.assertEqual(self.url_open('/dummy_erp/metrics').status_code, 403)
+
+    def test_route_exposes_the_last_runs(self):
+        ''' Ensure the last run of each job is exposed as Prometheus gauges '''
+        self.env['ir.config_parameter'].sudo().set_param('connector_dummy_erp.metrics_token', 'metrics-secret')
+        response = self.url_open('/dummy_erp/metrics', headers={'Authorization': 'Bearer metrics-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.text.splitlines()
+        labels = f'integration_id="{self.integration.id}",integration="Integration Test Name",job="export_product"'
+        self.assertIn('# TYPE dummy_erp_sync_last_duration_seconds gauge', lines)
+        self.assertIn(f'dummy_erp_sync_last_duration_seconds{{{labels}}} 1.5', lines)
+        self.assertIn(f'dummy_erp_sync_last_phase_seconds{{{labels},phase="http"}} 1.25', lines)
+        self.assertIn(f'dummy_erp_sync_last_requests{{{labels}}} 3.0', lines)
@@ -0,0 +1,102 @@
+import hashlib
+import hmac
+import json
+import time
+
+from odoo.tests import tagged, HttpCase, TransactionCase
+
+from .dummy_erp_payloads import get_cart_payload, get_product_payload
+
+
+@tagged('post_install', '-at_install')
+class TestWebhook(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+            'active': True,
+            'webhook_enabled': True,
+        })
+        cls.webhook_event = cls.env['dummy.erp.webhook.event']
+
+    def test_webhook_events_are_applied(self):
+        ''' Ensure only the last queued notification of a remote product is applied '''
+        self.webhook_event._queue_events(self.integration, [
+            {'resource': 'product', 'id': 9101, 'data': get_product_payload(9101, 10.0)},
+            {'resource': 'product', 'id': 9101, 'data': get_product_payload(9101, 12.0)},
+        ])
+        self.webhook_event._cron_process_webhook_events()
+        product = self.env['product.template'].get_product_id_by_dummy_erp_id(9101, self.integration)
+        self.assertEqual(product.list_price, 12.0)
+        events = self.webhook_event.search([('integration_id', '=', self.integration.id)])
+        self.assertEqual(set(events.mapped('state')), {'done'})
+
+    def test_existing_cart_lines_are_replaced(self):
+        ''' Ensure a notification of an imported cart replaces its lines with the remote ones '''
+        self.env['product.template'].create_or_update_from_dummy_erp_payload(self.integration, [
+            get_product_payload(9601, 10.0),
+        ])
+        user = self.env['res.users'].create({
+            'name': 'Cart User',
+            'login': 'dummy_erp_cart_user',
+            'dummy_erp_integration_id': self.integration.id,
+            'dummy_erp_id': 9602,
+        })
+        self.env['dummy.erp.binding']._bind(self.integration, 'res.users', [(9602, user.id)])
+        cart = get_cart_payload(9603, 9602, [(9601, 10.0, 1)])
+        self.env['sale.order'].create_from_dummy_erp_payload(user, self.integration, [cart])
+        cart['products'][0]['quantity'] = 4
+        self.webhook_event._queue_events(self.integration, [{'resource': 'cart', 'id': 9603, 'data': cart}])
+        self.webhook_event._cron_process_webhook_events()
+        order = self.env['sale.order'].search([('dummy_erp_id', '=', 9603)])
+        self.assertEqual(order.order_line.mapped('product_uom_qty'), [4.0])
+        self.assertFalse(order.update_to_dummy_erp, "Applying the remote cart should not export it back")
+        event = self.webhook_event.search([('integration_id', '=', self.integration.id)])
+        self.assertEqual(event.state, 'done')
+
+
+@tagged('post_install', '-at_install')
+class TestWebhookController(HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = cls.env['dummy.erp.integration'].create({
+            'name': 'Integration Test Name',
+            'active': True,
+            'webhook_enabled': True,
+        })
+        cls.url = f'/dummy_erp/webhook/{cls.integration.id}'
+        cls.body = json.dumps({'events': [{'resource': 'product', 'id': 9701}]}).encode()
+
+    def _post(self, body, timestamp=None, secret=None):
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        signature = hmac.new(
+            (secret or self.integration.webhook_secret).encode(), timestamp.encode() + b'.' + body, hashlib.sha256
+        ).hexdigest()
+        return self.url_open(self.url, data=body, headers={
+            'Content-Type': 'application/json',
+            'X-Dummy-ERP-Timestamp': timestamp,
+            'X-Dummy-ERP-Signature': f'sha256={signature}',
+        })
+
+    def test_signed_request_is_queued(self):
+        ''' Ensure a request signed with the secret of the integration queues its events '''
+        response = self._post(self.body)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'queued': 1})
+        events = self.env['dummy.erp.webhook.event'].search([('integration_id', '=', self.integration.id)])
+        self.assertEqual(events.mapped('remote_id'), [9701])
+
+    def test_invalid_signature_is_refused(self):
+        ''' Ensure requests signed with another secret, or replayed after the tolerance window, are refused '''
+        self.assertEqual(self._post(self.body, secret='wrong-secret').status_code, 403)
+        self.assertEqual(self._post(self.body, timestamp=int(time.time()) - 3600).status_code, 403)
+        self.assertFalse(self.env['dummy.erp.webhook.event'].search([('integration_id', '=', self.integration.id)]))
+
+    def test_disabled_webhook_is_not_found(self):
+        ''' Ensure the route is not available for an integration which does not receive webhooks '''
+        self.integration.webhook_enabled = False
+        self.assertEqual(self._post(self.body).status_code, 404)